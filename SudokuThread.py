@@ -1,4 +1,5 @@
 from threading import Thread, Semaphore
+from collections import deque
 
 class SudokuThread(Thread):
     def __init__(self, lock: Semaphore, finished_lock: Semaphore, id,target = None,  args = None) -> None:
@@ -8,6 +9,7 @@ class SudokuThread(Thread):
         self.running = False
         self.idd = id
         super().__init__(target=target, args=args)
+        self.number = int(self.name[7:]) # número usado nos resultados, lido do nome uma única vez
     
     def run(self):
         self.running = True
@@ -30,3 +32,27 @@ class SudokuThread(Thread):
         self.running = False
         self._target = None
         self.lock.release()
+
+
+class GridWorker(Thread):
+    """ Persistent thread that takes ranges of grids from a shared deque
+    until it is empty, keeping its results in its own list. There is no
+    handoff with the main thread: it only waits for the workers with join()
+    """
+
+    def __init__(self, tasks: deque, solutions, validation, name: str) -> None:
+        self.tasks = tasks
+        self.solutions = solutions
+        self.validation = validation
+        self.results: list[tuple[int, int]] = [] # (índice da solução, resultado da validação)
+        super().__init__(name=name)
+
+    def run(self):
+        while True:
+            try:
+                begin, end = self.tasks.popleft() # deque.popleft é atômico, dispensando locks
+            except IndexError:
+                return
+
+            for i in range(begin, end):
+                self.results.append((i, self.validation(self.solutions[i])))
@@ -0,0 +1,251 @@
+from sys import stderr
+from os import cpu_count, devnull
+from os.path import getsize
+from time import perf_counter
+import json
+import mmap
+import os
+import sys
+import numpy
+import binary_format
+import main
+import results_output
+import validate_game
+import validations
+from grid import GridList
+
+## Automatic choice of the strategy, processes, threads and batch size (--auto)
+#
+# Short calibration passes validate a sample of the input, with the output
+# discarded. For each configuration, the time of the sample and the time of
+# starting the processes with one puzzle each are measured, and the time of
+# the whole input is estimated as
+#     startup + (time of the sample - startup) * size of the input / size of the sample
+# The search is done in steps: first the strategy, with one process, the threads
+# given on the command line and only the first PROBE_SIZE puzzles of the sample,
+# then the processes and threads of the best strategy and, at last, its batch size.
+#
+# With --tune-cache=arquivo.json, the choice is saved in a JSON file, indexed by
+# the number of cores and by the order of magnitude of the input size, and
+# reused by the next runs on the same machine.
+
+SAMPLE_SIZE = 1000
+PROBE_SIZE = 100
+REPETITIONS = 2
+THREAD_CANDIDATES = [1, 2, 4, 9, 27]
+BATCH_CANDIDATES = {
+    validate_game.validate_game_task_ring: [8, 32, 128, 512],
+    validate_game.validate_many_games_at_once: [8, 32, 128, 512],
+}
+
+# estratégias que não usam threads, para as quais o número de threads não é ajustado
+THREADLESS_STRATEGIES = [validate_game.validate_game_sequentially, validate_game.validate_game_vectorized]
+
+
+def count_solutions(file: str) -> int:
+    """ Returns the number of puzzles of an input file, without reading them """
+    if binary_format.is_binary(file):
+        with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return binary_format.read_header(data)[1]
+
+    return (getsize(file) + 2) // main.RECORD_SIZE # o último quebra-cabeças pode não ter as quebras de linha finais
+
+
+def process_candidates(n_solutions: int) -> list[int]:
+    """ Returns the numbers of processes to be tried: the powers of two
+    up to the number of cores, and the number of cores itself
+    """
+    cores = cpu_count() or 1
+    candidates = []
+    n = 1
+    while n < cores:
+        candidates.append(n)
+        n *= 2
+    candidates.append(cores)
+
+    return [n for n in candidates if n <= max(n_solutions, 1)]
+
+
+def time_processes(solutions: numpy.ndarray, n_process: int, n_threads: int, validation_func) -> float:
+    """ Returns the best time, in seconds, of validating the solutions with
+    n_process processes, with the output of the processes discarded
+    """
+    if validation_func not in validate_game.ARRAY_STRATEGIES:
+        solutions = GridList.from_array(solutions)
+
+    best = float("inf")
+    for _ in range(REPETITIONS):
+        begin = perf_counter()
+        for proc in main.start_processes(solutions, 0, n_process, n_threads, validation_func):
+            proc.join()
+        best = min(best, perf_counter() - begin)
+
+    return best
+
+
+def estimate(sample: numpy.ndarray, n_solutions: int, n_process: int, n_threads: int, validation_func) -> float:
+    """ Estimates the time, in seconds, of validating n_solutions puzzles
+    from the time of validating the sample
+
+    Parameters
+    ----------
+    sample : numpy.ndarray
+        The puzzles of the sample, as an array (N, 9, 9)
+    n_solutions : int
+        The number of puzzles of the whole input
+    n_process : int
+        The number of processes
+    n_threads : int
+        The number of threads of each process
+    validation_func : function
+        The validation strategy (see validate_game.py)
+
+    Return
+    ------
+    float
+        The estimated time
+    """
+    startup = time_processes(sample[:n_process], n_process, n_threads, validation_func)
+    total = time_processes(sample, n_process, n_threads, validation_func)
+
+    return startup + max(total - startup, 0) * n_solutions / len(sample)
+
+
+def calibrate(sample: numpy.ndarray, n_solutions: int, n_threads: int) -> dict:
+    """ Searches the fastest configuration for the sample, in steps
+
+    Parameters
+    ----------
+    sample : numpy.ndarray
+        The puzzles of the sample, as an array (N, 9, 9)
+    n_solutions : int
+        The number of puzzles of the whole input
+    n_threads : int
+        The number of threads given on the command line, used while
+        choosing the strategy
+
+    Return
+    ------
+    dict
+        The strategy, the number of processes and threads, the batch size
+        (or None) and the estimated time of the chosen configuration
+    """
+    # 1. a estratégia, com um processo e poucos quebra-cabeças, pois algumas estratégias são lentas
+    best = None
+    for name, validation_func in validate_game.STRATEGIES.items():
+        threads = 1 if validation_func in THREADLESS_STRATEGIES else n_threads
+        seconds = estimate(sample[:PROBE_SIZE], n_solutions, 1, threads, validation_func)
+        if best is None or seconds < best["estimate"]:
+            best = {"strategy": name, "n_process": 1, "n_threads": threads, "batch_size": None, "estimate": seconds}
+
+    # a estimativa da estratégia escolhida é refeita com a amostra inteira
+    best["estimate"] = estimate(sample, n_solutions, 1, best["n_threads"], validate_game.STRATEGIES[best["strategy"]])
+
+    # 2. os processos e as threads da estratégia escolhida
+    validation_func = validate_game.STRATEGIES[best["strategy"]]
+    thread_candidates = [1] if validation_func in THREADLESS_STRATEGIES else THREAD_CANDIDATES
+    for n_process in process_candidates(n_solutions):
+        for threads in thread_candidates:
+            if (n_process, threads) == (best["n_process"], best["n_threads"]):
+                continue
+
+            seconds = estimate(sample, n_solutions, n_process, threads, validation_func)
+            if seconds < best["estimate"]:
+                best.update(n_process=n_process, n_threads=threads, estimate=seconds)
+
+    # 3. o tamanho dos lotes, se a estratégia usa lotes
+    if validation_func in BATCH_CANDIDATES:
+        default = validate_game.get_batch_size(validation_func)
+        best["batch_size"] = default
+        for batch_size in BATCH_CANDIDATES[validation_func]:
+            if batch_size == default:
+                continue
+
+            validate_game.set_batch_size(validation_func, batch_size)
+            seconds = estimate(sample, n_solutions, best["n_process"], best["n_threads"], validation_func)
+            if seconds < best["estimate"]:
+                best.update(batch_size=batch_size, estimate=seconds)
+        validate_game.set_batch_size(validation_func, default)
+
+    return best
+
+
+def cache_key(n_solutions: int) -> str:
+    """ Returns the key of a choice in the cache: the number of cores and
+    the order of magnitude of the input size
+    """
+    return f"{cpu_count() or 1} núcleos, {len(str(n_solutions))} dígitos"
+
+
+def read_cache(cache_file: str) -> dict:
+    """ Reads the choices saved in the cache, or returns an empty dict """
+    try:
+        with open(cache_file) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    return cache if isinstance(cache, dict) else {}
+
+
+def tune(file: str, n_threads: int, output_mode: str, block_size: int, cache_file: str = None) -> dict:
+    """ Chooses the fastest configuration for the input file on this machine,
+    reporting the choice to stderr
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+    n_threads : int
+        The number of threads given on the command line
+    output_mode : str
+        The output mode (see results_output.py), used in the calibration
+    block_size : int
+        The block size of the output, used in the calibration
+    cache_file : str
+        If given, path to the JSON file where the choices are saved
+
+    Return
+    ------
+    dict
+        The strategy, the number of processes and threads, the batch size
+        (or None) and the estimated time of the chosen configuration
+    """
+    n_solutions = count_solutions(file)
+    key = cache_key(n_solutions)
+    cache = read_cache(cache_file) if cache_file is not None else {}
+    choice = cache.get(key)
+    source = f"do cache {cache_file}"
+
+    if choice is None or choice.get("strategy") not in validate_game.STRATEGIES:
+        sample = next(main.iter_file_chunks(file, SAMPLE_SIZE, True), [])
+        if not isinstance(sample, numpy.ndarray):
+            sample = validations.solutions_to_array(sample)
+        if len(sample) == 0:
+            print("O arquivo indicado não contém quebra-cabeças")
+            exit(1)
+
+        # a saída dos processos de calibração é descartada
+        sys.stdout.flush()
+        saved_stdout = os.dup(1)
+        with open(devnull, "w") as null:
+            os.dup2(null.fileno(), 1)
+            try:
+                results_output.configure(output_mode, block_size)
+                choice = calibrate(sample, n_solutions, n_threads)
+            finally:
+                os.dup2(saved_stdout, 1)
+                os.close(saved_stdout)
+
+        source = f"calibrado com {len(sample)} quebra-cabeças"
+        if cache_file is not None:
+            cache[key] = choice
+            with open(cache_file, "w") as f:
+                json.dump(cache, f, indent=2, ensure_ascii=False)
+
+    batch = f", lote {choice['batch_size']}" if choice["batch_size"] is not None else ""
+    print(f"Ajuste automático ({source}): {choice['strategy']}, {choice['n_process']} processo(s), "
+          f"{choice['n_threads']} thread(s){batch}, estimativa de {choice['estimate']:.3f}s "
+          f"para {n_solutions} quebra-cabeças", file=stderr)
+
+    return choice
@@ -0,0 +1,222 @@
+from sys import stderr, maxsize
+from threading import Thread
+from contextlib import redirect_stdout
+from io import StringIO
+import sys
+import instrumentation
+import results_output
+from grid import GridList
+
+## Execution backends that run the workers inside a single process
+#
+# By default, main.py divides the puzzles between processes. Since the checks
+# are pure Python, threads of one process do not run them in parallel while
+# the GIL exists, but two other backends can:
+#   - threads: on free-threaded CPython builds (3.13+, without the GIL), each
+#     worker is a thread of the main process, which reads the puzzles
+#     directly, without pickling them
+#   - subinterpreters: on CPython 3.14+ (concurrent.interpreters), each worker
+#     runs in its own interpreter, with its own GIL, receiving its puzzles as
+#     bytes
+# The support is detected at runtime; when it is missing, main.py falls back
+# to processes. The workers keep the numbers of the processes they replace
+# (validate_game.worker), so the output is the same.
+#
+# The subinterpreters import this file, so it does not import numpy (neither
+# directly nor through validate_game) at the top.
+
+BACKEND_PROCESSES = "processes"
+BACKEND_THREADS = "threads"
+BACKEND_SUBINTERPRETERS = "subinterpreters"
+BACKEND_AUTO = "auto"
+BACKENDS = (BACKEND_PROCESSES, BACKEND_THREADS, BACKEND_SUBINTERPRETERS, BACKEND_AUTO)
+
+
+def free_threading() -> bool:
+    """ Returns True if this interpreter runs threads without the GIL """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def subinterpreters() -> bool:
+    """ Returns True if the validations can run in subinterpreters: the module
+    concurrent.interpreters exists and validate_game can be imported in
+    a subinterpreter (extension modules may not support them)
+    """
+    try:
+        from concurrent import interpreters
+    except ImportError:
+        return False
+
+    interpreter = interpreters.create()
+    try:
+        interpreter.exec(f"import sys\nsys.path[:] = {sys.path!r}\nimport validate_game")
+    except Exception:
+        return False
+    finally:
+        interpreter.close()
+
+    return True
+
+
+def choose_backend(name: str) -> str:
+    """ Returns the backend that will be used, falling back to processes
+    (with a message in stderr) when the backend asked is not supported
+
+    Parameters
+    ----------
+    name : str
+        One of BACKENDS. BACKEND_AUTO chooses threads, subinterpreters or
+        processes, in this order, by what is supported
+
+    Return
+    ------
+    str
+        BACKEND_PROCESSES, BACKEND_THREADS or BACKEND_SUBINTERPRETERS
+    """
+    if name == BACKEND_AUTO:
+        if free_threading():
+            return BACKEND_THREADS
+        return BACKEND_SUBINTERPRETERS if subinterpreters() else BACKEND_PROCESSES
+
+    if name == BACKEND_THREADS and not free_threading():
+        print("Este interpretador usa o GIL; usando processos em vez de threads", file=stderr)
+        return BACKEND_PROCESSES
+
+    if name == BACKEND_SUBINTERPRETERS and not subinterpreters():
+        print("Subinterpretadores não são suportados por este interpretador; usando processos", file=stderr)
+        return BACKEND_PROCESSES
+
+    return name
+
+
+def run_worker(process_number: int, validation_func, solutions, solution_number: int, n_threads: int) -> None:
+    """ Validates the solutions of one worker of the threads backend """
+    import validate_game
+    validate_game.worker.process_number = str(process_number)
+    with instrumentation.profiled(f"Worker-{process_number}"):
+        validation_func(solutions, solution_number, n_threads)
+
+
+def run_threads(validation_func, solutions, ranges: list[tuple[int, int]], n_threads: int) -> None:
+    """ Validates the solutions with one thread of this process for each
+    range, instead of one process
+
+    Parameters
+    ----------
+    validation_func : function
+        The validation strategy (see validate_game.py)
+    solutions : numpy.ndarray | GridList
+        The solutions to be validated
+    ranges : list[tuple[int, int]]
+        The range of the solutions of each worker (see main.split_solutions)
+    n_threads : int
+        The number of threads of each worker
+
+    Return
+    ------
+    None
+    """
+    workers = [
+        Thread(target=run_worker, args=(i + 1, validation_func, solutions[begin:end], begin + 1, n_threads), name=f"Worker-{i+1}")
+        for i, (begin, end) in enumerate(ranges)
+    ]
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    results_output.flush()
+    instrumentation.report()
+
+
+def pack_solutions(solutions) -> bytes:
+    """ Returns the cells of the solutions as bytes, 81 per puzzle """
+    if isinstance(solutions, GridList):
+        return solutions.cells
+
+    return solutions.astype("uint8").tobytes()
+
+
+def validate_in_interpreter(strategy: str, cells: bytes, solution_number: int, n_threads: int, process_number: int, output_mode: str) -> str:
+    """ Validates the puzzles of one worker of the subinterpreters backend,
+    inside the subinterpreter
+
+    Parameters
+    ----------
+    strategy : str
+        The name of the strategy (see validate_game.STRATEGIES)
+    cells : bytes
+        The cells of the puzzles (see pack_solutions), which the strategy
+        receives as a GridList, without copying them
+    solution_number : int
+        The number of the first puzzle
+    n_threads : int
+        The number of threads of the worker
+    process_number : int
+        The number of the process that the worker replaces
+    output_mode : str
+        The output mode (see results_output.py)
+
+    Return
+    ------
+    str
+        The output of the validation
+    """
+    import validate_game
+    validate_game.worker.process_number = str(process_number)
+    solutions = GridList(cells)
+
+    output = StringIO()
+    with redirect_stdout(output):
+        results_output.configure(output_mode, maxsize)
+        validate_game.STRATEGIES[strategy](solutions, solution_number, n_threads)
+        results_output.flush()
+
+    return output.getvalue()
+
+
+def run_subinterpreters(strategy: str, solutions, ranges: list[tuple[int, int]], n_threads: int, output_mode: str) -> None:
+    """ Validates the solutions with one subinterpreter for each range,
+    instead of one process, and prints their output in the order of the ranges
+
+    Parameters
+    ----------
+    strategy : str
+        The name of the strategy (see validate_game.STRATEGIES)
+    solutions : numpy.ndarray | GridList
+        The solutions to be validated
+    ranges : list[tuple[int, int]]
+        The range of the solutions of each worker (see main.split_solutions)
+    n_threads : int
+        The number of threads of each worker
+    output_mode : str
+        The output mode (see results_output.py)
+
+    Return
+    ------
+    None
+    """
+    from concurrent import interpreters
+
+    outputs = [""] * len(ranges)
+
+    def run(i: int, begin: int, end: int) -> None:
+        interpreter = interpreters.create()
+        try:
+            interpreter.exec(f"import sys\nsys.path[:] = {sys.path!r}")
+            # cada subinterpretador tem seu próprio GIL, então as chamadas rodam em paralelo
+            outputs[i] = interpreter.call(validate_in_interpreter, strategy, pack_solutions(solutions[begin:end]), begin + 1, n_threads, i + 1, output_mode)
+        finally:
+            interpreter.close()
+
+    workers = [Thread(target=run, args=(i, begin, end), name=f"Worker-{i+1}") for i, (begin, end) in enumerate(ranges)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    sys.stdout.write("".join(outputs))
+    sys.stdout.flush()
+    results_output.note_write()
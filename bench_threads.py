@@ -0,0 +1,58 @@
+from sys import argv
+from os import devnull
+from time import perf_counter
+from contextlib import redirect_stdout
+import numpy
+import main
+import results_output
+import validate_game
+from grid import GridList
+
+## Measures the synchronization overhead per puzzle of the thread-based strategies
+#
+# Each strategy validates the same puzzles in this process, with the output
+# discarded, and its time per puzzle is compared with the time of
+# validate_game_sequentially, which does the same work without threads.
+#
+# Uso: bench_threads.py [arquivo.txt] [número de threads] [repetições]
+
+STRATEGIES = [
+    "validate_game_sequentially",
+    "validate_game_creating_threads_once",
+    "validate_game_task_ring",
+]
+
+
+def time_strategy(validation_func, solutions: GridList, n_threads: int, repetitions: int) -> float:
+    """ Returns the best time, in seconds, of `repetitions` runs of a strategy """
+    best = float("inf")
+    with open(devnull, "w") as null, redirect_stdout(null):
+        results_output.configure(results_output.OUTPUT_ALL, 4096)
+        for _ in range(repetitions):
+            begin = perf_counter()
+            validation_func(solutions, 1, n_threads)
+            results_output.flush()
+            best = min(best, perf_counter() - begin)
+
+    return best
+
+
+if __name__ == "__main__":
+    if len(argv) < 2:
+        print("Uso: bench_threads.py [arquivo.txt] [número de threads] [repetições]")
+        exit(1)
+
+    n_threads = int(argv[2]) if len(argv) > 2 else 4
+    repetitions = int(argv[3]) if len(argv) > 3 else 3
+    solutions = main.load_solutions(argv[1])
+    if isinstance(solutions, numpy.ndarray):
+        solutions = GridList.from_array(solutions)
+
+    sequential = None
+    for name in STRATEGIES:
+        per_grid = time_strategy(validate_game.STRATEGIES[name], solutions, n_threads, repetitions) / len(solutions)
+        if sequential is None:
+            sequential = per_grid
+
+        print(f"{name}: {per_grid * 1e6:.1f} µs por quebra-cabeças, "
+              f"sobrecarga de sincronização = {(per_grid - sequential) * 1e6:.1f} µs")
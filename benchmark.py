@@ -0,0 +1,231 @@
+from sys import argv, executable, maxsize
+from multiprocessing import Process, Queue
+from contextlib import redirect_stdout
+from io import StringIO
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from os.path import exists, join
+import csv
+import json
+import resource
+import subprocess
+import sys
+import numpy
+import gen_solutions
+import main
+import results_output
+import validate_game
+from grid import GridList
+
+## Benchmark of the validation strategies
+#
+# Uso:
+#   benchmark.py run [--input=arquivo.txt | --size=N --error-rate=R --seed=S]
+#                    [--strategies=a,b] [--configs=1x1,4x4] [--repeat=N] [--warmup=N]
+#                    [--json=saída.json] [--csv=saída.csv]
+#   benchmark.py compare [antes.json] [depois.json] [--threshold=0.1]
+#
+# Each run is executed in a new interpreter (benchmark.py measure ...), which
+# measures its own phases, so the startup of the interpreter does not count:
+#   - parse: reading the input file (main.load_solutions)
+#   - distribute: creating and starting the processes
+#   - validate: the validation in the processes, with the output kept in memory
+#   - output: writing the output of the processes
+# plus the total time and the peak RSS of the main process and of the largest
+# child process.
+
+PHASES = ["parse", "distribute", "validate", "output", "total"]
+DEFAULT_CONFIGS = [(1, 1), (1, 4), (2, 1), (4, 4)]
+
+
+def timed_validation(validation_func, solutions, solution_number: int, n_threads: int, timings: Queue) -> None:
+    """ Validates the solutions of one process, measuring the validation
+    and the output separately, and sends the times to `timings`
+    """
+    output = StringIO()
+    begin = perf_counter()
+    with redirect_stdout(output):
+        results_output.configure(results_output.OUTPUT_ALL, maxsize)
+        validation_func(solutions, solution_number, n_threads)
+        results_output.flush()
+    validated = perf_counter()
+
+    sys.stdout.write(output.getvalue())
+    sys.stdout.flush()
+    timings.put({"validate": validated - begin, "output": perf_counter() - validated})
+
+
+def measure(file: str, strategy: str, n_process: int, n_threads: int) -> dict:
+    """ Runs the program once, measuring each phase
+
+    Return
+    ------
+    dict
+        The time of each phase, in seconds, and the peak RSS, in kB
+    """
+    validation_func = validate_game.STRATEGIES[strategy]
+    begin = perf_counter()
+    solutions = main.load_solutions(file)
+    if isinstance(solutions, numpy.ndarray) and validation_func not in validate_game.ARRAY_STRATEGIES:
+        solutions = GridList.from_array(solutions)
+    parsed = perf_counter()
+
+    timings = Queue()
+    process: list[Process] = []
+    for i, (first, end) in enumerate(main.split_solutions(len(solutions), n_process)):
+        process.append(Process(
+            target=timed_validation,
+            args=(validation_func, solutions[first:end], first + 1, n_threads, timings),
+            name=f"Process-{i+1}"
+        ))
+
+    for proc in process:
+        proc.start()
+    distributed = perf_counter()
+
+    process_timings = [timings.get() for _ in process]
+    for proc in process:
+        proc.join()
+    end = perf_counter()
+
+    return {
+        "parse": parsed - begin,
+        "distribute": distributed - parsed,
+        "validate": max(timing["validate"] for timing in process_timings),
+        "output": max(timing["output"] for timing in process_timings),
+        "total": end - begin,
+        "rss_main_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_child_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def run_once(file: str, strategy: str, n_process: int, n_threads: int, result_file: str) -> dict:
+    """ Runs `measure` in a new interpreter, discarding the output of the validation """
+    subprocess.run(
+        [executable, __file__, "measure", file, strategy, str(n_process), str(n_threads), result_file],
+        stdout=subprocess.DEVNULL,
+        check=True
+    )
+    with open(result_file) as f:
+        return json.load(f)
+
+
+def summarize(runs: list[dict]) -> list[dict]:
+    """ Groups the runs by configuration, with the median and the minimum of each phase """
+    groups: dict[tuple, list[dict]] = {}
+    for run in runs:
+        groups.setdefault((run["strategy"], run["n_process"], run["n_threads"]), []).append(run)
+
+    summary = []
+    for (strategy, n_process, n_threads), group in groups.items():
+        entry = {"strategy": strategy, "n_process": n_process, "n_threads": n_threads}
+        for key in PHASES + ["rss_main_kb", "rss_child_kb"]:
+            entry[f"{key}_median"] = median(run[key] for run in group)
+            entry[f"{key}_min"] = min(run[key] for run in group)
+        summary.append(entry)
+
+    return summary
+
+
+def run_benchmark(options: dict[str, str]) -> None:
+    """ Runs every strategy and configuration, printing and saving the results """
+    strategies = options["strategies"].split(",") if "strategies" in options else list(validate_game.STRATEGIES)
+    configs = DEFAULT_CONFIGS
+    if "configs" in options:
+        configs = [tuple(int(x) for x in config.split("x")) for config in options["configs"].split(",")]
+    repeat = main.int_option(options, "repeat", 3)
+    warmup = int(options.get("warmup", 1))
+
+    for strategy in strategies:
+        if strategy not in validate_game.STRATEGIES:
+            print(f"Estratégia desconhecida: {strategy}")
+            exit(1)
+
+    with TemporaryDirectory() as tmp:
+        file = options.get("input")
+        if file is None:
+            file = join(tmp, "corpus.txt")
+            gen_solutions.write_corpus(file, main.int_option(options, "size", 10000), int(options.get("seed", 0)), float(options.get("error-rate", 0.5)))
+        elif not exists(file):
+            print("O arquivo indicado não existe")
+            exit(1)
+
+        result_file = join(tmp, "result.json")
+        runs = []
+        for strategy in strategies:
+            for n_process, n_threads in configs:
+                for _ in range(warmup):
+                    run_once(file, strategy, n_process, n_threads, result_file)
+
+                for i in range(repeat):
+                    run = run_once(file, strategy, n_process, n_threads, result_file)
+                    run.update(strategy=strategy, n_process=n_process, n_threads=n_threads, repeat=i)
+                    runs.append(run)
+
+                print(f"{strategy}: {n_process} {n_threads} = "
+                      + ", ".join(f"{phase} {median(run[phase] for run in runs[-repeat:]):.3f}s" for phase in PHASES)
+                      + f", rss {max(run['rss_child_kb'] for run in runs[-repeat:]) // 1024} MB")
+
+    summary = summarize(runs)
+    if "json" in options:
+        with open(options["json"], "w") as f:
+            json.dump({"options": options, "runs": runs, "summary": summary}, f, indent=2)
+
+    if "csv" in options:
+        with open(options["csv"], "w", newline="") as f:
+            fields = ["strategy", "n_process", "n_threads", "repeat"] + PHASES + ["rss_main_kb", "rss_child_kb"]
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(runs)
+
+
+def compare(before_file: str, after_file: str, threshold: float) -> bool:
+    """ Compares the medians of two results of run_benchmark
+
+    Return
+    ------
+    bool
+        True if some phase of some configuration got slower than the threshold
+    """
+    with open(before_file) as f:
+        before = {(s["strategy"], s["n_process"], s["n_threads"]): s for s in json.load(f)["summary"]}
+    with open(after_file) as f:
+        after = {(s["strategy"], s["n_process"], s["n_threads"]): s for s in json.load(f)["summary"]}
+
+    regression = False
+    for key in sorted(before.keys() & after.keys()):
+        changes = []
+        for phase in PHASES:
+            old, new = before[key][f"{phase}_median"], after[key][f"{phase}_median"]
+            ratio = new / old if old > 0 else 1
+            mark = ""
+            if ratio > 1 + threshold:
+                mark = " (REGRESSÃO)"
+                regression = True
+            changes.append(f"{phase} {old:.3f}s -> {new:.3f}s{mark}")
+
+        strategy, n_process, n_threads = key
+        print(f"{strategy}: {n_process} {n_threads}: " + ", ".join(changes))
+
+    return regression
+
+
+if __name__ == "__main__":
+    argv, options = main.parse_options(argv)
+    command = argv[1] if len(argv) > 1 else ""
+
+    if command == "measure" and len(argv) == 7:
+        result = measure(argv[2], argv[3], int(argv[4]), int(argv[5]))
+        with open(argv[6], "w") as f:
+            json.dump(result, f)
+    elif command == "run":
+        run_benchmark(options)
+    elif command == "compare" and len(argv) == 4:
+        if compare(argv[2], argv[3], float(options.get("threshold", 0.1))):
+            exit(1)
+    else:
+        print("Uso: benchmark.py run [--input=arquivo.txt | --size=N --error-rate=R --seed=S] "
+              "[--strategies=a,b] [--configs=1x1,4x4] [--repeat=N] [--warmup=N] [--json=saída.json] [--csv=saída.csv]")
+        print("     benchmark.py compare [antes.json] [depois.json] [--threshold=0.1]")
+        exit(1)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+from typing import Iterator
+import mmap
+import struct
+
+## This is a file with the functions that read and write the binary grid format
+#
+# The file starts with a 16 bytes header:
+#   - magic number b"SDKB"
+#   - version of the format (1 byte)
+#   - cell encoding (1 byte): ENCODING_BYTES (one byte per cell, 81 bytes per grid)
+#     or ENCODING_NIBBLES (4 bits per cell, 41 bytes per grid)
+#   - 2 bytes of padding
+#   - number of grids (8 bytes, little endian)
+# and is followed by the grids, one after another, in row-major order.
+#
+# numpy is imported by the functions that use it, so is_binary can be used
+# without loading it (see main.py --fast-start).
+
+MAGIC = b"SDKB"
+VERSION = 1
+ENCODING_BYTES = 0
+ENCODING_NIBBLES = 1
+HEADER = struct.Struct("<4sBBxxQ")
+RECORD_SIZES = {ENCODING_BYTES: 81, ENCODING_NIBBLES: 41}
+
+
+def is_binary(file: str) -> bool:
+    """ Verify if a file is in the binary format
+
+    Parameters
+    ----------
+    file : str
+        path to the file
+
+    Return
+    ------
+    bool
+        True if the file starts with the magic number
+    """
+    with open(file, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def pack_grids(grids: numpy.ndarray, encoding: int = ENCODING_NIBBLES) -> numpy.ndarray:
+    """ Convert (N, 9, 9) grids into the records of the binary format
+
+    Parameters
+    ----------
+    grids : numpy.ndarray
+        Array with shape (N, 9, 9) containing the solutions
+    encoding : int
+        ENCODING_BYTES or ENCODING_NIBBLES
+
+    Return
+    ------
+    numpy.ndarray
+        uint8 array with shape (N, 81) or (N, 41)
+    """
+    import numpy
+    cells = numpy.asarray(grids, dtype=numpy.uint8).reshape(-1, 81)
+    if encoding == ENCODING_BYTES:
+        return cells
+
+    if cells.size > 0 and cells.max() > 15:
+        raise ValueError("valores maiores que 15 não cabem em 4 bits")
+
+    padded = numpy.zeros((cells.shape[0], 82), dtype=numpy.uint8)
+    padded[:, :81] = cells
+    return (padded[:, 0::2] << 4) | padded[:, 1::2]
+
+
+def unpack_grids(records: numpy.ndarray, encoding: int) -> numpy.ndarray:
+    """ Convert the records of the binary format into (N, 9, 9) grids
+
+    Parameters
+    ----------
+    records : numpy.ndarray
+        uint8 array with shape (N, 81) or (N, 41)
+    encoding : int
+        ENCODING_BYTES or ENCODING_NIBBLES
+
+    Return
+    ------
+    numpy.ndarray
+        uint8 array with shape (N, 9, 9)
+    """
+    import numpy
+    if encoding == ENCODING_BYTES:
+        return numpy.array(records, dtype=numpy.uint8).reshape(-1, 9, 9)
+
+    cells = numpy.empty((records.shape[0], 82), dtype=numpy.uint8)
+    cells[:, 0::2] = records >> 4
+    cells[:, 1::2] = records & 0x0F
+    return cells[:, :81].reshape(-1, 9, 9)
+
+
+def write_binary(file: str, grids: numpy.ndarray, encoding: int = ENCODING_NIBBLES) -> None:
+    """ Write grids to a file in the binary format
+
+    Parameters
+    ----------
+    file : str
+        path to the output file
+    grids : numpy.ndarray
+        Array with shape (N, 9, 9) containing the solutions
+    encoding : int
+        ENCODING_BYTES or ENCODING_NIBBLES
+
+    Return
+    ------
+    None
+    """
+    records = pack_grids(grids, encoding)
+    with open(file, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, encoding, records.shape[0]))
+        f.write(records.tobytes())
+
+
+def read_header(data: bytes | mmap.mmap) -> tuple[int, int]:
+    """ Read and verify the header of a binary file
+
+    Parameters
+    ----------
+    data : bytes | mmap.mmap
+        The content of the file
+
+    Return
+    ------
+    tuple[int, int]
+        The cell encoding and the number of grids
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("arquivo binário sem cabeçalho")
+
+    magic, version, encoding, n_grids = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("o arquivo não está no formato binário")
+    if version != VERSION:
+        raise ValueError(f"versão {version} do formato binário não suportada")
+    if encoding not in RECORD_SIZES:
+        raise ValueError(f"codificação {encoding} desconhecida")
+    if len(data) != HEADER.size + n_grids * RECORD_SIZES[encoding]:
+        raise ValueError(f"o cabeçalho indica {n_grids} quebra-cabeças, mas o tamanho do arquivo não corresponde")
+
+    return encoding, n_grids
+
+
+def iter_binary_chunks(file: str, chunk_size: int) -> Iterator[numpy.ndarray]:
+    """ Read a binary file lazily, yielding arrays of up to chunk_size grids
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+    chunk_size : int
+        maximum number of grids in each chunk
+
+    Return
+    ------
+    Iterator[numpy.ndarray]
+        uint8 arrays with shape (n, 9, 9), in order
+    """
+    import numpy
+    with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        encoding, n_grids = read_header(mm)
+        records = numpy.frombuffer(mm, dtype=numpy.uint8, offset=HEADER.size).reshape(n_grids, RECORD_SIZES[encoding])
+
+        for begin in range(0, n_grids, chunk_size):
+            yield unpack_grids(records[begin:begin + chunk_size], encoding)
+
+        del records # a view of the mapping must not outlive it
+
+
+def read_binary(file: str) -> numpy.ndarray:
+    """ Read all the grids of a binary file
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+
+    Return
+    ------
+    numpy.ndarray
+        uint8 array with shape (N, 9, 9)
+    """
+    import numpy
+    with open(file, "rb") as f:
+        data = f.read()
+
+    encoding, n_grids = read_header(data)
+    records = numpy.frombuffer(data, dtype=numpy.uint8, offset=HEADER.size).reshape(n_grids, RECORD_SIZES[encoding])
+    return unpack_grids(records, encoding)
@@ -0,0 +1,227 @@
+from concurrent.futures import ThreadPoolExecutor
+from math import isqrt
+import results_output
+import validate_game
+from grid import ValidationResult
+from validations import LINE, COLUMN, current_thread_number
+
+## Validation of boards of any box size n: n² x n² cells and 3n² constraints
+#
+# The boards are read from a text file (main.py --box-size=n) with one line of
+# the board per line of the file, its n² cells written as numbers separated by
+# spaces, so that cells like 16 or 25 fit, and an empty line after each board.
+# Boards with up to 9 cells per line may also be written as digits, like the
+# files of 9x9 puzzles.
+#
+# The error mask has the layout of validations.py scaled to 3n² bits: bits 0
+# to n²-1 are the lines, then come the columns and the regions. Python ints
+# have no width limit, so the masks of the digits and of the errors are
+# bitsets for any n, and the threads split the 3n² constraints between them.
+# This is the only validation of main.py --box-size, which refuses the
+# strategies of validate_game.py and the other execution modes.
+
+
+def read_boards(file: str, box_size: int) -> list[list[list[int]]]:
+    """ Read the boards of a text file, exiting with an error message if a
+    board does not have n² lines of n² numbers
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+    box_size : int
+        The size n of the regions of the boards
+
+    Return
+    ------
+    list[list[list[int]]]
+        The boards of the file, in order
+    """
+    size = box_size * box_size
+    boards = []
+    board = []
+    with open(file, "r") as f:
+        for line in f:
+            cells = line.split()
+            if len(cells) > 0:
+                if len(cells) == 1 and size <= 9:
+                    cells = list(cells[0])
+                board.append(cells)
+                continue
+
+            if len(board) > 0:
+                boards.append(parse_board(board, len(boards) + 1, size))
+                board = []
+
+    if len(board) > 0:
+        boards.append(parse_board(board, len(boards) + 1, size))
+
+    return boards
+
+
+def parse_board(lines: list[list[str]], board_number: int, size: int) -> list[list[int]]:
+    """ Convert the cells read by read_boards into a board of size x size numbers """
+    if len(lines) != size:
+        print(f"O tabuleiro {board_number} tem {len(lines)} linhas em vez de {size}")
+        exit(1)
+
+    for line_number, cells in enumerate(lines, 1):
+        if len(cells) != size:
+            print(f"A linha {line_number} do tabuleiro {board_number} tem {len(cells)} células em vez de {size}")
+            exit(1)
+
+    try:
+        return [[int(cell) for cell in cells] for cells in lines]
+    except ValueError:
+        print(f"O tabuleiro {board_number} tem uma célula que não é um número")
+        exit(1)
+
+
+def full_mask(size: int) -> int:
+    """ Return the mask of a unit with each number from 1 to size: bits 1
+    to size set (FULL_MASK of validations.py, for 9x9 boards)
+    """
+    return ((1 << size) - 1) << 1
+
+
+def unit_cells(board: list[list[int]], box_size: int, code: int) -> list[int]:
+    """ Return the cells of the line, column or region of the error `code` """
+    size = box_size * box_size
+    kind, index = divmod(code, size)
+    if kind == LINE:
+        return board[index]
+    if kind == COLUMN:
+        return [line[index] for line in board]
+
+    first_line = index // box_size * box_size
+    first_column = index % box_size * box_size
+    return [value for line in board[first_line:first_line + box_size] for value in line[first_column:first_column + box_size]]
+
+
+def validate_units(board: list[list[int]], box_size: int, begin: int, end: int) -> int:
+    """ Validate the constraints with the codes from `begin` to `end` of a board
+
+    Parameters
+    ----------
+    board : list
+        The board
+    box_size : int
+        The size n of its regions
+    begin, end : int
+        The range of codes (bits of the error mask) to validate
+
+    Return
+    ------
+    int
+        The error mask of those constraints
+    """
+    size = box_size * box_size
+    full = full_mask(size)
+    error_mask = 0
+    for code in range(begin, end):
+        mask = 0
+        for value in unit_cells(board, box_size, code):
+            # zeros e valores fora do intervalo vão para o bit 0, que não faz parte de full
+            mask |= 1 << value if 1 <= value <= size else 1
+        if mask != full:
+            error_mask |= 1 << code
+
+    return error_mask
+
+
+def validate_board(board: list[list[int]], box_size: int) -> int:
+    """ Validate the 3n² constraints of a board in a single traversal,
+    like validations.validate_grid
+
+    Parameters
+    ----------
+    board : list
+        The board
+    box_size : int
+        The size n of its regions
+
+    Return
+    ------
+    int
+        The error mask of the board (0 means that it is valid)
+    """
+    size = box_size * box_size
+    lines = [0] * size
+    columns = [0] * size
+    regions = [0] * size
+
+    for i, line in enumerate(board):
+        region_line = i // box_size * box_size
+        line_mask = 0
+        for j, value in enumerate(line):
+            bit = 1 << value if 1 <= value <= size else 1
+            line_mask |= bit
+            columns[j] |= bit
+            regions[region_line + j // box_size] |= bit
+        lines[i] = line_mask
+
+    full = full_mask(size)
+    error_mask = 0
+    for bit, mask in enumerate(lines + columns + regions):
+        if mask != full:
+            error_mask |= 1 << bit
+
+    return error_mask
+
+
+def run_units(board: list[list[int]], box_size: int, begin: int, end: int) -> tuple[int, int]:
+    """ Runs validate_units in a thread of a pool, returning its error mask
+    together with the number of the thread
+    """
+    return validate_units(board, box_size, begin, end), current_thread_number()
+
+
+def validate_boards(boards: list[list[list[int]]], solution_number: int, n_threads: int) -> None:
+    """ Validates boards of any box size, dividing the 3n² constraints of
+    each board in one contiguous range for each thread
+
+    Parameters
+    ----------
+    boards : list
+        The boards that one process is going to validate
+    solution_number : int
+        The number of the first board
+    n_threads : int
+        The number of threads that the program is using (at most 3n²)
+
+    Return
+    ------
+    None
+    """
+    process_number = validate_game.current_process_number()
+    with ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="Thread") as pool:
+        for i, board in enumerate(boards):
+            size = len(board)
+            box_size = isqrt(size)
+            validate_game.print_progress(process_number, solution_number + i)
+
+            if n_threads == 1:
+                results = validate_game.results_from_mask(validate_board(board, box_size), current_thread_number())
+            else:
+                n_units = 3 * size
+                futures = [
+                    pool.submit(run_units, board, box_size, k * n_units // n_threads, (k + 1) * n_units // n_threads)
+                    for k in range(n_threads)
+                ]
+
+                results = []
+                for future in futures:
+                    error_mask, thread_num = future.result()
+                    if error_mask == 0:
+                        continue
+
+                    # uma thread do pool pode ter validado mais de um intervalo
+                    for result in results:
+                        if result.thread_num == thread_num:
+                            result.error_mask |= error_mask
+                            break
+                    else:
+                        results.append(ValidationResult(error_mask, thread_num))
+
+            n_errors, line = validate_game.format_results(results, process_number, size)
+            results_output.writer.result(solution_number + i, n_errors, line)
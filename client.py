@@ -0,0 +1,100 @@
+from sys import argv, stdout
+from os.path import abspath, exists
+import json
+import socket
+
+## Client of server.py: sends an input file to the running server and
+## prints the results, with the same arguments and output as main.py
+#
+# The point of the client is to skip the startup of main.py, so it imports
+# only the standard library (not main, server or numpy), and repeats here the
+# few things of them that it needs.
+
+SOCKET_PATH = "/tmp/sudoku-validator.sock" # o mesmo de server.SOCKET_PATH
+
+
+def read_grids(file: str) -> list[str]:
+    """ Reads the puzzles of a text file, each one as a string with its
+    81 cells, exiting with an error message if the file is not in the
+    text format or a puzzle is incomplete
+    """
+    with open(file, "rb") as f:
+        if f.read(4) == b"SDKB":
+            print("--send aceita apenas arquivos de texto; sem --send, o servidor lê o arquivo binário")
+            exit(1)
+
+    with open(file, "r") as f:
+        lines = f.read().split("\n")
+
+    grids = []
+    # cada quebra-cabeças tem 9 linhas, seguidas de uma linha vazia
+    for begin in range(0, len(lines), 10):
+        rows = [line[:9] for line in lines[begin:begin + 9]]
+        if rows == [""]:
+            break
+        if len(rows) < 9 or any(len(row) < 9 for row in rows):
+            print(f"O quebra-cabeças {len(grids) + 1} está incompleto")
+            exit(1)
+        grids.append("".join(rows))
+
+    return grids
+
+
+if __name__ == "__main__":
+    args = [arg for arg in argv if not arg.startswith("--")]
+    options = dict(arg[2:].partition("=")[::2] for arg in argv if arg.startswith("--"))
+
+    if len(args) < 4:
+        print("Uso: client.py [arquivo.txt|arquivo.bin] [número de processos] [número de threads] [estratégia] [--output=all|quiet|errors] [--send] [--socket=caminho]")
+        exit(1)
+
+    file = args[1]
+    if not exists(file):
+        print("O arquivo indicado não existe")
+        exit(1)
+
+    try:
+        n_process, n_threads = [int(x) for x in args[2:4]]
+    except ValueError:
+        print("O a quantidade de threads ou processos deve ser um número inteiro!")
+        exit(1)
+
+    if n_process < 1 or n_threads < 1:
+        print("O número de threads e processos deve ser pelo menos 1")
+        exit(1)
+
+    request = {
+        "n_process": n_process,
+        "n_threads": n_threads,
+        "strategy": args[4] if len(args) > 4 else "",
+        "output": options.get("output", "all"),
+    }
+
+    # --send envia os quebra-cabeças pelo socket, para quando o servidor não tem acesso ao arquivo
+    if "send" in options:
+        request["grids"] = read_grids(file)
+    else:
+        request["file"] = abspath(file)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(options.get("socket", SOCKET_PATH))
+        except OSError:
+            print("Não foi possível conectar ao servidor (server.py)")
+            exit(1)
+
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        for line in connection.makefile("rb"):
+            response = json.loads(line)
+            if "error" in response:
+                print(f"Erro: {response['error']}")
+                exit(1)
+            if response.get("done"):
+                break
+
+            stdout.write(response["output"])
+            stdout.flush()
+        else:
+            # a conexão foi fechada antes do fim da resposta (ver o protocolo em server.py)
+            print("O servidor encerrou a conexão sem terminar a resposta")
+            exit(1)
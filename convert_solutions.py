@@ -0,0 +1,23 @@
+from sys import argv
+from os.path import exists
+import binary_format
+import main
+import validations
+
+## Converts an input file in the text format (like the output of gen_solutions.py)
+## into the binary format read by main.py
+
+if __name__ == "__main__":
+    argv, options = main.parse_options(argv)
+    if len(argv) < 3:
+        print("Uso: convert_solutions.py [entrada.txt] [saída.bin] [--bytes]")
+        exit(1)
+
+    if not exists(argv[1]):
+        print("O arquivo indicado não existe")
+        exit(1)
+
+    encoding = binary_format.ENCODING_BYTES if "bytes" in options else binary_format.ENCODING_NIBBLES
+    grids = validations.solutions_to_array(main.load_solutions(argv[1]))
+    binary_format.write_binary(argv[2], grids, encoding)
+    print(f"{len(grids)} quebra-cabeças convertidos para {argv[2]}")
@@ -1,10 +1,339 @@
-for i in range(int(2e5)):
-    for j in range(9):
-        line = ""
-        for k in range(9):
-            line += str(k+1)
-        print(line)
-            
-    print()
+from sys import argv
+from os.path import exists
+import numpy
+import binary_format
+import main
+from validations import ERROR_KINDS, NUM_VALIDATIONS, error_labels
 
+## Generator of input files for main.py, with the output expected for them
+#
+# Uso:
+#   gen_solutions.py [saída.txt|saída.bin] [quantidade] [--seed=N] [--error-rate=R]
+#                    [--line-errors=N] [--column-errors=N] [--region-errors=N]
+#                    [--binary] [--bytes] [--expected=esperado.txt] [--chunk-size=N]
+#   gen_solutions.py --check=esperado.txt [saída de main.py]
+#
+# Every puzzle is the base solution with its bands and stacks, and the lines
+# and columns inside them, shuffled and its digits relabeled, which always
+# gives a valid solution. A fraction `error-rate` of the puzzles gets errors,
+# made in the base solution before the shuffle, each one breaking known units:
+#   - line error: two cells of a column, inside a region, are swapped, so
+#     their two lines are wrong (at most one per band, so up to 3)
+#   - column error: two cells of a line, inside a region, are swapped, so
+#     their two columns are wrong (at most one per stack, so up to 3)
+#   - region errors: whole lines of 2 (1 error) or 3 (2 errors) different
+#     bands, not touched by the line errors, are rotated, so the regions of
+#     those bands are wrong
+# The swaps keep the other units valid, so the errors of each puzzle are
+# known without validating it. The expected file has the result line of each
+# puzzle as main.py writes it, without the process and the threads, e.g.
+# "4 erros encontrados (L4, L6, C2, C3)".
 
+CHUNK_SIZE = 1 << 16 # quebra-cabeças gerados e escritos de cada vez
+MAX_ERRORS = {"line-errors": 3, "column-errors": 3, "region-errors": 2}
+
+rows, columns = numpy.indices((9, 9))
+BASE = ((rows * 3 + rows // 3 + columns) % 9).astype(numpy.uint8) # solução válida, com dígitos de 0 a 8
+
+
+def shuffled_units(rng: numpy.random.Generator, n: int) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """ Shuffle the lines (or columns) of n puzzles, keeping each band (or stack) together
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        The random generator
+    n : int
+        The number of puzzles
+
+    Return
+    ------
+    tuple[numpy.ndarray, numpy.ndarray]
+        For each puzzle, the line of the base solution placed at each line,
+        with shape (n, 9), and the band placed at each band, with shape (n, 3)
+    """
+    groups = rng.permuted(numpy.tile(numpy.arange(3), (n, 1)), axis=1)
+    inside = rng.permuted(numpy.tile(numpy.arange(3), (n, 3, 1)), axis=2)
+    return (3 * groups[:, :, None] + inside).reshape(n, 9), groups
+
+
+def swap(grids: numpy.ndarray, puzzles: numpy.ndarray, first: tuple, second: tuple) -> None:
+    """ Swap the cells `first` and `second`, given as (lines, columns), of each puzzle """
+    grids[puzzles, first[0], first[1]], grids[puzzles, second[0], second[1]] = \
+        grids[puzzles, second[0], second[1]], grids[puzzles, first[0], first[1]]
+
+
+def wrong_grids(rng: numpy.random.Generator, n: int, line_errors: int, column_errors: int, region_errors: int) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """ Create n copies of the base solution with errors (see the top of this file)
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        The random generator
+    n : int
+        The number of puzzles
+    line_errors : int
+        The number of line errors, from 0 to 3
+    column_errors : int
+        The number of column errors, from 0 to 3
+    region_errors : int
+        The number of region errors, from 0 to 2
+
+    Return
+    ------
+    tuple[numpy.ndarray, numpy.ndarray]
+        The puzzles, with shape (n, 9, 9), and their wrong units, a bool
+        array with shape (n, 27) in the order of the error mask
+    """
+    grids = numpy.tile(BASE, (n, 1, 1))
+    errors = numpy.zeros((n, NUM_VALIDATIONS), dtype=bool)
+    puzzles = numpy.arange(n)
+
+    # a linha de cada banda que os erros de linha não tocam
+    left_out = 3 * numpy.arange(3) + rng.integers(0, 3, (n, 3))
+
+    for band in range(line_errors):
+        column = rng.integers(0, 9, n)
+        skipped = left_out[:, band] - 3 * band
+        first, second = 3 * band + (skipped + 1) % 3, 3 * band + (skipped + 2) % 3
+        swap(grids, puzzles, (first, column), (second, column))
+        errors[puzzles, first] = errors[puzzles, second] = True
+
+    for stack in range(column_errors):
+        line = rng.integers(0, 9, n)
+        skipped = rng.integers(0, 3, n)
+        first, second = 3 * stack + (skipped + 1) % 3, 3 * stack + (skipped + 2) % 3
+        swap(grids, puzzles, (line, first), (line, second))
+        errors[puzzles, 9 + first] = errors[puzzles, 9 + second] = True
+
+    if region_errors > 0:
+        bands = rng.permuted(numpy.tile(numpy.arange(3), (n, 1)), axis=1)[:, :region_errors + 1]
+        lines = numpy.take_along_axis(left_out, bands, axis=1)
+        grids[puzzles[:, None], lines] = grids[puzzles[:, None], numpy.roll(lines, 1, axis=1)]
+        errors[puzzles[:, None, None], 18 + 3 * bands[:, :, None] + numpy.arange(3)] = True
+
+    return grids, errors
+
+
+def generate_grids(rng: numpy.random.Generator, n: int, error_rate: float, line_errors: int, column_errors: int, region_errors: int) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """ Generate n puzzles, a fraction `error_rate` of them with errors
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        The random generator
+    n : int
+        The number of puzzles
+    error_rate : float
+        The fraction of the puzzles with errors
+    line_errors, column_errors, region_errors : int
+        The errors of each puzzle with errors (see wrong_grids)
+
+    Return
+    ------
+    tuple[numpy.ndarray, numpy.ndarray]
+        uint8 array with shape (n, 9, 9) with digits from 1 to 9, and the
+        bool array with shape (n, 27) of the wrong units of each puzzle
+    """
+    grids = numpy.tile(BASE, (n, 1, 1))
+    errors = numpy.zeros((n, NUM_VALIDATIONS), dtype=bool)
+    wrong = numpy.flatnonzero(rng.random(n) < error_rate)
+    grids[wrong], errors[wrong] = wrong_grids(rng, len(wrong), line_errors, column_errors, region_errors)
+
+    lines, bands = shuffled_units(rng, n)
+    columns, stacks = shuffled_units(rng, n)
+    grids = grids[numpy.arange(n)[:, None, None], lines[:, :, None], columns[:, None, :]]
+
+    # os erros acompanham as linhas, colunas e regiões para onde foram movidas
+    regions = (3 * bands[:, :, None] + stacks[:, None, :]).reshape(n, 9)
+    errors = numpy.concatenate([
+        numpy.take_along_axis(errors[:, :9], lines, axis=1),
+        numpy.take_along_axis(errors[:, 9:18], columns, axis=1),
+        numpy.take_along_axis(errors[:, 18:], regions, axis=1),
+    ], axis=1)
+
+    labels = rng.permuted(numpy.tile(numpy.arange(1, 10, dtype=numpy.uint8), (n, 1)), axis=1)
+    grids = numpy.take_along_axis(labels, grids.reshape(n, 81), axis=1).reshape(n, 9, 9)
+    return grids, errors
+
+
+def to_text(grids: numpy.ndarray) -> bytes:
+    """ Convert (n, 9, 9) grids into the text format: 9 lines of digits
+    and an empty line for each puzzle
+    """
+    text = numpy.full((len(grids), 91), ord("\n"), dtype=numpy.uint8)
+    text[:, :90].reshape(-1, 9, 10)[:, :, :9] = grids + ord("0")
+    return text.tobytes()
+
+
+def result_line(labels: list[str]) -> str:
+    """ Return the result line of a puzzle with the errors `labels`, as
+    main.py writes it but without the process and the threads
+    """
+    if len(labels) == 0:
+        return "0 erros encontrados"
+    return f"{len(labels)} erros encontrados ({', '.join(labels)})"
+
+
+def expected_lines(errors: numpy.ndarray) -> str:
+    """ Return the expected result lines of puzzles with the wrong units `errors` """
+    masks = (errors.astype(numpy.uint32) << numpy.arange(NUM_VALIDATIONS, dtype=numpy.uint32)).sum(axis=1, dtype=numpy.uint32)
+    # poucos conjuntos de erros diferentes: cada um é formatado uma só vez
+    unique, inverse = numpy.unique(masks, return_inverse=True)
+    lines = numpy.array([result_line(error_labels(mask)) + "\n" for mask in unique], dtype=object)
+    return "".join(lines[inverse])
+
+
+def write_corpus(file: str, size: int, seed: int = 0, error_rate: float = 0.5, line_errors: int = 1,
+                 column_errors: int = 1, region_errors: int = 1, encoding: int | None = None,
+                 expected: str | None = None, chunk_size: int = CHUNK_SIZE) -> None:
+    """ Write an input file with `size` puzzles, generated CHUNK_SIZE at a time
+
+    Parameters
+    ----------
+    file : str
+        path to the output file
+    size : int
+        The number of puzzles
+    seed : int
+        The seed of the random generator; the same seed gives the same file
+    error_rate : float
+        The fraction of the puzzles with errors
+    line_errors, column_errors, region_errors : int
+        The errors of each puzzle with errors (see wrong_grids)
+    encoding : int | None
+        None for the text format, or the encoding of the binary format
+    expected : str | None
+        If given, path to the file where the expected result line of each
+        puzzle is written
+    chunk_size : int
+        The number of puzzles generated and written at a time
+
+    Return
+    ------
+    None
+    """
+    rng = numpy.random.default_rng(seed)
+    expected_file = open(expected, "w") if expected is not None else None
+    try:
+        with open(file, "wb") as f:
+            if encoding is not None:
+                f.write(binary_format.HEADER.pack(binary_format.MAGIC, binary_format.VERSION, encoding, size))
+
+            for begin in range(0, size, chunk_size):
+                grids, errors = generate_grids(rng, min(chunk_size, size - begin), error_rate, line_errors, column_errors, region_errors)
+                if encoding is None:
+                    f.write(to_text(grids))
+                else:
+                    f.write(binary_format.pack_grids(grids, encoding).tobytes())
+
+                if expected_file is not None:
+                    expected_file.write(expected_lines(errors))
+    finally:
+        if expected_file is not None:
+            expected_file.close()
+
+
+def normalize(line: str) -> str:
+    """ Remove the process and the threads of a result line of main.py,
+    keeping the errors in the order lines, columns, regions
+    """
+    _, _, line = line.partition(": ")
+    _, _, errors = line.partition(" (")
+    labels = [label.rpartition(" ")[2] for group in errors.rstrip(")").split("; ") for label in group.split(", ") if label]
+    labels.sort(key=lambda label: (ERROR_KINDS.index(label[0]), int(label[1:])))
+    return result_line(labels)
+
+
+def check_output(expected: str, output: str) -> int:
+    """ Compare the output of main.py, in the order of the puzzles (one
+    process or --ordered, --output=all or quiet), with the expected file
+
+    Parameters
+    ----------
+    expected : str
+        path to the expected file written by write_corpus
+    output : str
+        path to the output of main.py
+
+    Return
+    ------
+    int
+        The number of puzzles whose result is different from the expected one
+    """
+    with open(expected) as f:
+        expected_results = f.read().splitlines()
+    with open(output) as f:
+        results = [normalize(line) for line in f.read().splitlines() if line and "resolvendo" not in line]
+
+    differences = 0
+    for solution_number, (wanted, result) in enumerate(zip(expected_results, results), 1):
+        if wanted != result:
+            if differences < 10:
+                print(f"Quebra-cabeças {solution_number}: esperado '{wanted}', encontrado '{result}'")
+            differences += 1
+
+    if len(results) != len(expected_results):
+        print(f"Esperados {len(expected_results)} resultados, encontrados {len(results)}")
+        differences += abs(len(results) - len(expected_results))
+
+    return differences
+
+
+def count_option(options: dict[str, str], name: str, default: int) -> int:
+    """ Read the number of errors of a kind, exiting with an error message if it is invalid """
+    try:
+        value = int(options.get(name, default))
+    except ValueError:
+        print(f"O valor de --{name} deve ser um número inteiro!")
+        exit(1)
+
+    if not 0 <= value <= MAX_ERRORS[name]:
+        print(f"O valor de --{name} deve estar entre 0 e {MAX_ERRORS[name]}")
+        exit(1)
+
+    return value
+
+
+if __name__ == "__main__":
+    argv, options = main.parse_options(argv)
+
+    if "check" in options:
+        if len(argv) < 2 or not exists(options["check"]) or not exists(argv[1]):
+            print("Uso: gen_solutions.py --check=esperado.txt [saída de main.py]")
+            exit(1)
+
+        differences = check_output(options["check"], argv[1])
+        print(f"{differences} diferenças" if differences else "Todos os resultados conferem")
+        exit(1 if differences else 0)
+
+    if len(argv) < 3:
+        print("Uso: gen_solutions.py [saída.txt|saída.bin] [quantidade] [--seed=N] [--error-rate=R] "
+              "[--line-errors=N] [--column-errors=N] [--region-errors=N] [--binary] [--bytes] "
+              "[--expected=esperado.txt] [--chunk-size=N]")
+        exit(1)
+
+    try:
+        size, seed = int(argv[2]), int(options.get("seed", 0))
+        error_rate = float(options.get("error-rate", 0.5))
+    except ValueError:
+        print("A quantidade e a semente devem ser números inteiros, e a taxa de erros um número")
+        exit(1)
+
+    if size < 0 or not 0 <= error_rate <= 1:
+        print("A quantidade não pode ser negativa e a taxa de erros deve estar entre 0 e 1")
+        exit(1)
+
+    encoding = None
+    if "binary" in options or "bytes" in options:
+        encoding = binary_format.ENCODING_BYTES if "bytes" in options else binary_format.ENCODING_NIBBLES
+
+    write_corpus(
+        argv[1], size, seed, error_rate,
+        count_option(options, "line-errors", 1),
+        count_option(options, "column-errors", 1),
+        count_option(options, "region-errors", 1),
+        encoding,
+        options.get("expected"),
+        main.int_option(options, "chunk-size", CHUNK_SIZE),
+    )
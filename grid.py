@@ -0,0 +1,136 @@
+from typing import Iterator
+
+## Compact types for the puzzles and the results of the validations
+#
+# A Grid keeps the 81 cells of a puzzle in a single bytes object, instead of
+# 10 lists, and a GridList keeps the cells of many puzzles in a single bytes
+# object, so a chunk of puzzles is pickled (to be sent to another process) as
+# one block of memory. A Grid is indexed like the list of lists it replaces:
+# grid[i] is the line i, as bytes, and grid[i][j] the cell (i, j), as an int.
+#
+# This file does not import numpy at the top, since it is also imported by the
+# subinterpreters of backends.py.
+
+
+class Grid:
+    """ The 81 cells of a puzzle, line by line
+
+    Parameters
+    ----------
+    cells : bytes
+        The values of the 81 cells
+    """
+
+    __slots__ = ("cells",)
+
+    def __init__(self, cells: bytes) -> None:
+        self.cells = cells
+
+    @classmethod
+    def from_rows(cls, rows: list[list[int]]) -> "Grid":
+        """ Creates a grid from a list of 9 lines """
+        cells = bytes(value for row in rows for value in row)
+        if len(cells) != 81:
+            raise ValueError(f"um quebra-cabeças deve ter 81 células, não {len(cells)}")
+
+        return cls(cells)
+
+    def __getitem__(self, line: int) -> bytes:
+        return self.cells[9 * line:9 * line + 9]
+
+    def __iter__(self) -> Iterator[bytes]:
+        cells = self.cells
+        for begin in range(0, 81, 9):
+            yield cells[begin:begin + 9]
+
+    def __len__(self) -> int:
+        return 9
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Grid) and self.cells == other.cells
+
+    def __hash__(self) -> int:
+        return hash(self.cells)
+
+    def __reduce__(self):
+        return Grid, (self.cells,)
+
+    def to_lists(self) -> list[list[int]]:
+        """ Returns the grid as a list of 9 lists """
+        return [list(row) for row in self]
+
+
+class GridList:
+    """ A sequence of grids kept in a single bytes object
+
+    Parameters
+    ----------
+    cells : bytes
+        The values of the cells, 81 for each grid
+    """
+
+    __slots__ = ("cells",)
+
+    def __init__(self, cells: bytes = b"") -> None:
+        self.cells = cells
+
+    @classmethod
+    def from_array(cls, grids) -> "GridList":
+        """ Creates a GridList from a numpy.ndarray (N, 9, 9) """
+        return cls(grids.astype("uint8", copy=False).tobytes())
+
+    @classmethod
+    def from_grids(cls, grids: list) -> "GridList":
+        """ Creates a GridList from a list of Grid or of lists of lines """
+        return cls(b"".join(grid.cells if isinstance(grid, Grid) else Grid.from_rows(grid).cells for grid in grids))
+
+    def __len__(self) -> int:
+        return len(self.cells) // 81
+
+    def __getitem__(self, index: int | slice) -> "Grid | GridList":
+        if isinstance(index, slice):
+            begin, end, step = index.indices(len(self))
+            if step != 1:
+                return GridList.from_grids([self[i] for i in range(begin, end, step)])
+            return GridList(self.cells[81 * begin:81 * max(begin, end)])
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("índice de quebra-cabeças fora dos limites")
+
+        return Grid(self.cells[81 * index:81 * index + 81])
+
+    def __iter__(self) -> Iterator[Grid]:
+        cells = self.cells
+        for begin in range(0, len(cells), 81):
+            yield Grid(cells[begin:begin + 81])
+
+    def __reduce__(self):
+        return GridList, (self.cells,)
+
+    def to_array(self):
+        """ Returns the grids as a numpy.ndarray (N, 9, 9) of uint8 """
+        import numpy
+        return numpy.frombuffer(self.cells, dtype=numpy.uint8).reshape(-1, 9, 9)
+
+
+class ValidationResult:
+    """ The errors of a puzzle found by one thread
+
+    Parameters
+    ----------
+    error_mask : int
+        The 27-bit mask of the errors (see validations.error_code)
+    thread_num : int
+        The number of the thread that found them
+    """
+
+    __slots__ = ("error_mask", "thread_num")
+
+    def __init__(self, error_mask: int, thread_num: int) -> None:
+        self.error_mask = error_mask
+        self.thread_num = thread_num
+
+    def __repr__(self) -> str:
+        return f"ValidationResult({self.error_mask:#x}, {self.thread_num})"
@@ -0,0 +1,198 @@
+from sys import argv, stderr, stdin
+from os.path import exists
+import numpy
+import main
+import results_output
+import validate_game
+import validations
+
+## Incremental re-validation of edited puzzles
+#
+# IncrementalValidator keeps, for each puzzle, how many times each digit
+# appears in each of its 27 units (lines, columns and regions) and how many
+# digits of 1 to 9 appear exactly once in each unit, which is 9 only when the
+# unit is valid. A presence bitmask (see validations.unit_mask) cannot forget
+# a digit that appears twice, so the counts are kept instead. An edit of a
+# cell updates only its line, column and region, in O(1), and the 27-bit
+# error mask of the puzzle (the layout of validations.validate_batch).
+#
+# Uso: incremental.py [arquivo.txt|arquivo.bin] [edições.txt | -] [--output=all|quiet|errors]
+#
+# Each line of the edits file has four numbers: the puzzle (from 1), the line
+# and the column (from 1 to 9) and the new value of the cell. The results of
+# the puzzles whose errors changed are printed as in main.py.
+
+
+class IncrementalValidator:
+    """ Keeps the state of the units of a set of puzzles, updated cell by cell
+
+    Parameters
+    ----------
+    solutions : numpy.ndarray | GridList
+        The puzzles, as loaded by main.load_solutions
+    """
+
+    def __init__(self, solutions) -> None:
+        self.grids = numpy.array(solutions if isinstance(solutions, numpy.ndarray) else validations.solutions_to_array(solutions), dtype=numpy.uint8)
+        n_grids = len(self.grids)
+
+        # os valores fora de 1..9 são contados no dígito 0, que nunca torna uma unidade válida
+        digits = numpy.where((self.grids >= 1) & (self.grids <= 9), self.grids, 0)
+        units = numpy.concatenate((
+            digits,
+            digits.transpose(0, 2, 1),
+            digits.reshape(n_grids, 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(n_grids, 9, 9)
+        ), axis=1)
+
+        self.counts = numpy.zeros((n_grids, validations.NUM_VALIDATIONS, 10), dtype=numpy.uint8)
+        for digit in range(10):
+            self.counts[:, :, digit] = (units == digit).sum(axis=2)
+        self.singles = (self.counts[:, :, 1:] == 1).sum(axis=2).astype(numpy.uint8)
+
+        weights = numpy.left_shift(numpy.uint32(1), numpy.arange(validations.NUM_VALIDATIONS, dtype=numpy.uint32))
+        self.masks = (self.singles != 9).astype(numpy.uint32) @ weights
+
+    def __len__(self) -> int:
+        return len(self.grids)
+
+    def error_mask(self, index: int) -> int:
+        """ Returns the 27-bit error mask of the puzzle `index` (from 0) """
+        return int(self.masks[index])
+
+    def edit(self, index: int, line: int, column: int, value: int) -> int:
+        """ Changes one cell and updates its line, column and region
+
+        Parameters
+        ----------
+        index : int
+            The index of the puzzle, from 0
+        line : int
+            The line of the cell, from 0 to 8
+        column : int
+            The column of the cell, from 0 to 8
+        value : int
+            The new value of the cell, from 0 to 255
+
+        Return
+        ------
+        int
+            The new error mask of the puzzle
+        """
+        if not (0 <= line < 9 and 0 <= column < 9):
+            raise ValueError(f"a célula ({line + 1}, {column + 1}) não existe")
+        if not 0 <= value <= 255:
+            raise ValueError(f"o valor {value} não pode ser guardado em uma célula")
+
+        old = int(self.grids[index, line, column])
+        old_digit = old if 1 <= old <= 9 else 0
+        new_digit = value if 1 <= value <= 9 else 0
+        self.grids[index, line, column] = value
+        if old_digit == new_digit:
+            return int(self.masks[index])
+
+        counts = self.counts[index]
+        singles = self.singles[index]
+        mask = int(self.masks[index])
+        for unit in (line, 9 + column, 18 + (line // 3) * 3 + column // 3):
+            unit_singles = int(singles[unit])
+
+            count = int(counts[unit, old_digit])
+            if old_digit != 0:
+                unit_singles += (count == 2) - (count == 1)
+            counts[unit, old_digit] = count - 1
+
+            count = int(counts[unit, new_digit])
+            if new_digit != 0:
+                unit_singles += (count == 0) - (count == 1)
+            counts[unit, new_digit] = count + 1
+
+            singles[unit] = unit_singles
+            if unit_singles == 9:
+                mask &= ~(1 << unit)
+            else:
+                mask |= 1 << unit
+
+        self.masks[index] = mask
+        return mask
+
+    def apply(self, edits: list[tuple[int, int, int, int]]) -> dict[int, int]:
+        """ Applies a list of edits (see edit)
+
+        Parameters
+        ----------
+        edits : list[tuple[int, int, int, int]]
+            The edits, each one (index, line, column, value)
+
+        Return
+        ------
+        dict[int, int]
+            The new error mask of each puzzle whose errors changed
+        """
+        before: dict[int, int] = {}
+        for index, line, column, value in edits:
+            before.setdefault(index, int(self.masks[index]))
+            self.edit(index, line, column, value)
+
+        return {index: int(self.masks[index]) for index, mask in before.items() if self.masks[index] != mask}
+
+
+def print_changes(changes: dict[int, int], process_number: int = 1) -> None:
+    """ Prints the results of the puzzles whose errors changed, in order,
+    in the format of validate_game.print_results
+    """
+    thread_num = validations.current_thread_number()
+    for index in sorted(changes):
+        validate_game.print_results(validate_game.results_from_mask(changes[index], thread_num), process_number, solution_number=index + 1)
+
+    results_output.flush()
+
+
+def read_edits(lines, n_grids: int) -> list[tuple[int, int, int, int]]:
+    """ Reads the edits, converting them to indexes from 0 """
+    edits = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            continue
+
+        try:
+            solution, row, column, value = [int(x) for x in line.split()]
+        except ValueError:
+            print(f"Edição inválida na linha {line_number}: {line}")
+            exit(1)
+
+        if not (1 <= solution <= n_grids and 1 <= row <= 9 and 1 <= column <= 9 and 0 <= value <= 255):
+            print(f"Edição fora dos limites na linha {line_number}: {line}")
+            exit(1)
+
+        edits.append((solution - 1, row - 1, column - 1, value))
+
+    return edits
+
+
+if __name__ == "__main__":
+    argv, options = main.parse_options(argv)
+    if len(argv) < 3:
+        print("Uso: incremental.py [arquivo.txt|arquivo.bin] [edições.txt | -] [--output=all|quiet|errors]")
+        exit(1)
+
+    if not exists(argv[1]) or (argv[2] != "-" and not exists(argv[2])):
+        print("O arquivo indicado não existe")
+        exit(1)
+
+    output_mode = options.get("output", results_output.OUTPUT_ALL)
+    if output_mode not in results_output.OUTPUT_MODES:
+        print(f"O valor de --output deve ser um destes: {', '.join(results_output.OUTPUT_MODES)}")
+        exit(1)
+    results_output.configure(output_mode, main.int_option(options, "block-size", 256))
+
+    validator = IncrementalValidator(main.load_solutions(argv[1]))
+    if argv[2] == "-":
+        edits = read_edits(stdin, len(validator))
+    else:
+        with open(argv[2]) as f:
+            edits = read_edits(f, len(validator))
+
+    changes = validator.apply(edits)
+    print_changes(changes)
+    print(f"{len(edits)} edições, {len(changes)} quebra-cabeças com erros alterados", file=stderr)
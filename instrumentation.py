@@ -0,0 +1,230 @@
+from threading import Lock, current_thread
+from time import perf_counter
+from typing import Callable, Iterator
+from contextlib import contextmanager
+import cProfile
+import multiprocessing
+import os
+import sys
+
+## Opt-in instrumentation of the validations
+#
+# Enabled with the option --instrument of main.py or with the environment
+# variable SUDOKU_INSTRUMENT=1. Each process counts, for each of its threads,
+# the puzzles and the checks (line, column or region validations) done, the
+# time spent computing them and the time spent waiting on Semaphores, Futures
+# and Queues, plus the depth of the queue read by handle_results. A summary is
+# written to stderr when the process finishes its validations.
+#
+# With SUDOKU_PROFILE_DIR=dir (or --profile-dir=dir), each worker also dumps a
+# cProfile to dir/<name>-<pid>.prof: the processes of main.py, of the pools of
+# --pipeline and --verdict and the workers of --backend=threads (see profiled).
+# The threads created by the strategies themselves are not profiled.
+#
+# When disabled, the functions return the validations unchanged and the
+# contexts do nothing, so the validations are not slowed down.
+
+ENABLED = os.environ.get("SUDOKU_INSTRUMENT", "") not in ("", "0")
+PROFILE_DIR = os.environ.get("SUDOKU_PROFILE_DIR") or None
+
+
+class ThreadStats:
+    """ Counters of one thread """
+
+    __slots__ = ("grids", "checks", "compute", "wait")
+
+    def __init__(self) -> None:
+        self.grids = 0
+        self.checks = 0
+        self.compute = 0.0
+        self.wait: dict[str, float] = {}
+
+
+_lock = Lock()
+_stats: dict[str, ThreadStats] = {}
+_process_grids = 0
+_queue_depths: list[int] = []
+_profiles: dict[str, cProfile.Profile] = {}
+
+
+def enable(profile_dir: str = None) -> None:
+    """ Enables the instrumentation in this process and in the processes created by it
+
+    Parameters
+    ----------
+    profile_dir : str
+        If given, directory where each process dumps its cProfile
+
+    Return
+    ------
+    None
+    """
+    global ENABLED, PROFILE_DIR
+    ENABLED = True
+    os.environ["SUDOKU_INSTRUMENT"] = "1"
+    if profile_dir is not None:
+        PROFILE_DIR = profile_dir
+        os.environ["SUDOKU_PROFILE_DIR"] = profile_dir
+        os.makedirs(profile_dir, exist_ok=True)
+
+
+def thread_stats() -> ThreadStats:
+    """ Returns the counters of the current thread """
+    name = current_thread().name
+    stats = _stats.get(name)
+    if stats is None:
+        with _lock:
+            stats = _stats.setdefault(name, ThreadStats())
+
+    return stats
+
+
+def wrap_check(func: Callable, checks_per_call: int = 1, grids_per_call: int = 0) -> Callable:
+    """ Returns `func` counting its calls and the time spent in it
+
+    Parameters
+    ----------
+    func : Callable
+        A validation function
+    checks_per_call : int
+        The number of checks done by each call (27 for validations.validate_grid)
+    grids_per_call : int
+        The number of puzzles validated by each call
+
+    Return
+    ------
+    Callable
+        `func` itself, if the instrumentation is disabled
+    """
+    if not ENABLED:
+        return func
+
+    def instrumented(*args):
+        begin = perf_counter()
+        result = func(*args)
+        stats = thread_stats()
+        stats.compute += perf_counter() - begin
+        stats.checks += checks_per_call
+        stats.grids += grids_per_call
+        return result
+
+    instrumented.__name__ = func.__name__
+    return instrumented
+
+
+def wrap_checks(funcs: list[Callable]) -> list[Callable]:
+    """ Applies wrap_check to a list of functions that do one check each """
+    return [wrap_check(func) for func in funcs]
+
+
+def count_batch(n_grids: int, checks_per_grid: int, seconds: float) -> None:
+    """ Counts a batch of puzzles validated at once (see validations.validate_batch) """
+    if ENABLED:
+        stats = thread_stats()
+        stats.grids += n_grids
+        stats.checks += n_grids * checks_per_grid
+        stats.compute += seconds
+
+
+def count_progress() -> None:
+    """ Counts a puzzle of the process that started to be validated """
+    global _process_grids
+    if ENABLED:
+        with _lock:
+            _process_grids += 1
+
+
+def record_queue_depth(depth: int) -> None:
+    """ Records the depth of the queue read by handle_results """
+    if ENABLED:
+        _queue_depths.append(depth)
+
+
+class waiting:
+    """ Context that adds the time spent inside it to the waiting time
+    of the current thread
+
+    Parameters
+    ----------
+    kind : str
+        What the thread waits on, like "semaphore", "future" or "queue"
+    """
+
+    __slots__ = ("kind", "begin")
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+
+    def __enter__(self) -> None:
+        if ENABLED:
+            self.begin = perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        if ENABLED:
+            stats = thread_stats()
+            stats.wait[self.kind] = stats.wait.get(self.kind, 0.0) + perf_counter() - self.begin
+
+
+@contextmanager
+def profiled(name: str = None) -> Iterator[None]:
+    """ Profiles the block, if PROFILE_DIR is set. The blocks with the same
+    name add up in one profile, dumped again at the end of each block, so
+    the workers that validate many chunks keep a single file
+
+    Parameters
+    ----------
+    name : str
+        The name of the profile, by default the name of the process. A
+        profile only sees the thread that runs the block, so each thread
+        needs its own name
+
+    Return
+    ------
+    Iterator[None]
+    """
+    if not ENABLED or PROFILE_DIR is None:
+        yield
+        return
+
+    name = name or multiprocessing.current_process().name
+    with _lock:
+        profile = _profiles.setdefault(name, cProfile.Profile())
+
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(os.path.join(PROFILE_DIR, f"{name}-{os.getpid()}.prof"))
+
+
+def run_profiled(func: Callable, *args) -> None:
+    """ Calls func(*args), dumping a cProfile of the call if PROFILE_DIR is set """
+    with profiled():
+        func(*args)
+
+
+def report() -> None:
+    """ Writes the summary of the counters of this process to stderr and resets them """
+    global _process_grids
+    if not ENABLED:
+        return
+
+    with _lock:
+        lines = [f"[instrumentação] {multiprocessing.current_process().name} (pid {os.getpid()}): "
+                 f"{_process_grids} quebra-cabeças, {sum(s.checks for s in _stats.values())} validações"]
+        for name, stats in sorted(_stats.items()):
+            waits = ", ".join(f"{kind} {seconds:.3f}s" for kind, seconds in sorted(stats.wait.items()))
+            lines.append(f"    {name}: {stats.grids} quebra-cabeças, {stats.checks} validações, "
+                         f"computando {stats.compute:.3f}s, esperando {sum(stats.wait.values()):.3f}s"
+                         + (f" ({waits})" if waits else ""))
+        if _queue_depths:
+            lines.append(f"    fila de handle_results: máximo {max(_queue_depths)}, "
+                         f"média {sum(_queue_depths) / len(_queue_depths):.1f}")
+
+        _stats.clear()
+        _queue_depths.clear()
+        _process_grids = 0
+
+    sys.stderr.write("\n".join(lines) + "\n")
+    sys.stderr.flush()
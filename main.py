@@ -1,10 +1,46 @@
-from sys import argv
-from multiprocessing import Process
-from os.path import exists
+from __future__ import annotations
+from time import time
+START_TIME = time() # antes dos outros imports, que fazem parte do tempo de início (ver startup_report)
+
+from sys import argv, stderr, stdout, maxsize
+from multiprocessing import Queue, shared_memory, current_process
+from os.path import exists, getsize
 from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, count
+from contextlib import contextmanager, redirect_stdout
+from io import StringIO
+from queue import Empty
+from typing import Iterator
+import mmap
+import multiprocessing
+import backends
+import binary_format
+import boards
+import instrumentation
+import result_cache
+import results_output
 import validate_game
+import validations
+from grid import GridList
 
 ## This is the main file of the program
+#
+# numpy, asyncio and the modules of --auto and --pipeline are imported only by
+# the functions that use them, so a small run does not pay for their import
+# (see --fast-start).
+
+# contexto dos processos criados pelo programa (ver use_forkserver)
+context = multiprocessing.get_context()
+
+# com --startup-report, recebe dos processos o instante do primeiro resultado escrito (ver startup_report)
+first_result = None
+
+# tamanho máximo dos arquivos de texto lidos sem numpy com --fast-start
+FAST_START_MAX_SIZE = 1 << 20
+
+# opções que boards.py não suporta (ver --box-size)
+BOX_SIZE_UNSUPPORTED = ["stream", "pipeline", "shared-memory", "work-stealing", "verdict", "verdict-bitmap",
+                        "auto", "batch-size", "cache", "shared-cache", "backend"]
 
 def validate_input(argv) -> tuple[str, int, int]:
     """ Validate arguments in argv
@@ -22,7 +58,7 @@ def validate_input(argv) -> tuple[str, int, int]:
     """
     
     if len(argv) < 4:
-        print("Uso: main.py [arquivo.txt] [número de processos] [número de threads]")
+        print("Uso: main.py [arquivo.txt|arquivo.bin] [número de processos] [número de threads] [estratégia] [--stream | --pipeline | --shared-memory | --work-stealing | --backend=processes|threads|subinterpreters|auto] [--chunk-size=N] [--output=all|quiet|errors] [--verdict | --verdict-bitmap=arquivo] [--ordered] [--block-size=N] [--batch-size=N] [--auto] [--tune-cache=arquivo.json] [--cache=N] [--shared-cache] [--instrument] [--profile-dir=diretório] [--fast-start] [--startup-report] [--box-size=N]")
         exit(1)
     
     file = argv[1]
@@ -44,7 +80,127 @@ def validate_input(argv) -> tuple[str, int, int]:
 
 
 
-def read_file(file: str) -> list[list[list[int]]]:
+def parse_options(argv: list[str]) -> tuple[list[str], dict[str, str]]:
+    """ Separate the positional arguments from the optional ones
+
+    Parameters
+    ----------
+    argv : list
+        list with the arguments of the program
+
+    Return
+    ------
+    tuple[list[str], dict[str, str]]
+        The positional arguments and a dictionary with the options given as
+        --name=value (or just --name, in which case the value is "")
+
+    """
+    args = []
+    options = {}
+    for arg in argv:
+        if arg.startswith("--"):
+            name, _, value = arg[2:].partition("=")
+            options[name] = value
+        else:
+            args.append(arg)
+
+    return args, options
+
+
+def int_option(options: dict[str, str], name: str, default: int) -> int:
+    """ Read an integer option, exiting with an error message if it is invalid
+
+    Parameters
+    ----------
+    options : dict
+        The options returned by parse_options
+    name : str
+        The name of the option
+    default : int
+        The value used when the option is not given
+
+    Return
+    ------
+    int
+        The value of the option
+
+    """
+    if name not in options:
+        return default
+
+    try:
+        value = int(options[name])
+    except ValueError:
+        print(f"O valor de --{name} deve ser um número inteiro!")
+        exit(1)
+
+    if value < 1:
+        print(f"O valor de --{name} deve ser pelo menos 1")
+        exit(1)
+
+    return value
+
+
+def iter_solutions(file: str) -> Iterator[list[list[int]]]:
+    """ Read the input file lazily, yielding one solution at a time
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+
+    Return
+    ------
+    Iterator[list[list[int]]]
+        The matrices of the file, in order. ValueError is raised at the
+        first puzzle that is incomplete or has a line without 9 digits
+
+    """
+    with open(file, "r") as f:
+        for solution_number in count(1):
+            lines = list(islice(f, 9))
+            if len(lines) == 0:
+                return
+
+            if len(lines) < 9:
+                raise ValueError(f"O quebra-cabeças {solution_number} está incompleto: tem {len(lines)} linhas em vez de 9")
+
+            try:
+                solution = [[int(line[j]) for j in range(9)] for line in lines]
+            except (ValueError, IndexError):
+                raise ValueError(f"O quebra-cabeças {solution_number} tem uma linha que não começa com 9 dígitos") from None
+
+            yield solution
+
+            next(f, None) # skip the empty line between each matrix
+
+
+def iter_chunks(file: str, chunk_size: int) -> Iterator[GridList]:
+    """ Read the input file lazily, yielding GridLists of up to chunk_size solutions
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+    chunk_size : int
+        maximum number of solutions in each chunk
+
+    Return
+    ------
+    Iterator[GridList]
+        The chunks of the file, in order
+
+    """
+    solutions = iter_solutions(file)
+    while True:
+        chunk = GridList.from_grids(islice(solutions, chunk_size))
+        if len(chunk) == 0:
+            return
+
+        yield chunk
+
+
+def read_file(file: str) -> GridList:
     """ Read the input file and create a list containing the various solutions on it
 
     Parameters
@@ -54,54 +210,165 @@ def read_file(file: str) -> list[list[list[int]]]:
 
     Return
     ------
-    list[list[list[int]]]
-        A list of matrices, where each one represents a solution
+    GridList
+        The solutions of the file, in order
 
     """
+    return GridList.from_grids(iter_solutions(file))
 
-    with open(file, "r") as f:
-        lines = f.readlines()
-    
-    curr_line_index = 0
-    matrices = []
-    while curr_line_index < len(lines):
-        # create an empty matrix
-        matrix = [[0 for j in range(9)] for i in range(9)]
-
-        for i in range(9):
-            curr_line = lines[curr_line_index]
-            for j in range(9):
-                matrix[i][j] = int(curr_line[j])
-        
-            curr_line_index += 1
 
-        curr_line_index += 1 # increment the index since theres an empty line between each matrix
-        matrices.append(matrix)
+RECORD_SIZE = 91 # 9 lines with 9 digits and a line break, plus the empty line
 
-                
-    return matrices
-   
 
-def create_process(solutions: list[list[list[int]]], n_process: int, n_threads: int, validation_func) -> None:
-    """ Creates the processes
+def parse_records(records: numpy.ndarray, first_solution: int) -> numpy.ndarray | None:
+    """ Convert fixed-width text records into digits, checking their format
 
     Parameters
     ----------
-    solutions : list[list[list[int]]]
-        The list of all of the solutions
+    records : numpy.ndarray
+        uint8 array with shape (N, 91), one record of the input file per row
+    first_solution : int
+        The index of the first record in the input file, used in the error message
+
+    Return
+    ------
+    numpy.ndarray | None
+        uint8 array with shape (N, 9, 9), or None if some record is malformed
+
+    """
+    import numpy
+    lines = records[:, :90].reshape(-1, 9, 10)
+    digits = lines[:, :, :9]
+
+    bad_records = (
+        (lines[:, :, 9] != ord("\n")).any(axis=1)
+        | ((digits < ord("0")) | (digits > ord("9"))).any(axis=(1, 2))
+        | (records[:, 90] != ord("\n"))
+    )
+    if bad_records.any():
+        bad = int(numpy.argmax(bad_records))
+        bad_lines = (lines[bad, :, 9] != ord("\n")) | ((digits[bad] < ord("0")) | (digits[bad] > ord("9"))).any(axis=1)
+        bad_line = int(numpy.argmax(bad_lines)) if bad_lines.any() else 9
+        print(f"Formato inválido no quebra-cabeças {first_solution + bad + 1} "
+              f"(linha {(first_solution + bad) * 10 + bad_line + 1}), usando a leitura lenta", file=stderr)
+        return None
+
+    return digits - numpy.uint8(ord("0"))
+
+
+def read_file_mmap(file: str) -> numpy.ndarray | None:
+    """ Read the input file by mapping it in memory and viewing it as an
+    (N, 91) byte array, without converting each character with int()
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+
+    Return
+    ------
+    numpy.ndarray | None
+        uint8 array with shape (N, 9, 9), or None if the file is not in
+        the fixed-width format (nine lines of nine digits and an empty line)
+
+    """
+    import numpy
+    size = getsize(file)
+    if size == 0:
+        return numpy.zeros((0, 9, 9), dtype=numpy.uint8)
+
+    n_records, tail_size = divmod(size, RECORD_SIZE)
+    # o último quebra-cabeças pode não ter a linha vazia ou a última quebra de linha
+    if tail_size not in (0, RECORD_SIZE - 1, RECORD_SIZE - 2):
+        print(f"Tamanho inválido do arquivo ({size} bytes), usando a leitura lenta", file=stderr)
+        return None
+
+    with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = numpy.frombuffer(mm, dtype=numpy.uint8)
+        solutions = parse_records(data[:n_records * RECORD_SIZE].reshape(-1, RECORD_SIZE), 0)
+
+        if solutions is not None and tail_size != 0:
+            tail = numpy.full(RECORD_SIZE, ord("\n"), dtype=numpy.uint8)
+            tail[:tail_size] = data[n_records * RECORD_SIZE:]
+            last = parse_records(tail.reshape(1, RECORD_SIZE), n_records)
+            solutions = None if last is None else numpy.concatenate((solutions, last))
+
+        del data # a view of the mapping must not outlive it
+
+    return solutions
+
+
+def read_solutions(file: str, use_numpy: bool = True) -> numpy.ndarray | GridList:
+    """ Read the input file, which may be in the binary format (see
+    binary_format.py) or in the text format. Text files are read with
+    read_file_mmap, falling back to read_file if the file is not in
+    the fixed-width format
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+    use_numpy : bool
+        If False, text files are read by read_file, without importing numpy
+
+    Return
+    ------
+    numpy.ndarray | GridList
+        The solutions of the file. ValueError is raised, with the message
+        shown to the user, if the file is invalid (see load_solutions)
+
+    """
+    if binary_format.is_binary(file):
+        try:
+            return binary_format.read_binary(file)
+        except ValueError as error:
+            raise ValueError(f"Arquivo binário inválido: {error}") from error
+
+    if not use_numpy:
+        return read_file(file)
+
+    solutions = read_file_mmap(file)
+    if solutions is None:
+        return read_file(file)
+
+    return solutions
+
+
+def load_solutions(file: str, use_numpy: bool = True) -> numpy.ndarray | GridList:
+    """ Read the input file with read_solutions, exiting with an error
+    message if it is invalid
+    """
+    try:
+        return read_solutions(file, use_numpy)
+    except ValueError as error:
+        print(error)
+        exit(1)
+
+
+def split_solutions(n_solutions: int, n_process: int) -> list[tuple[int, int]]:
+    """ Divides the solutions in contiguous ranges, one for each process
+
+    Parameters
+    ----------
+    n_solutions : int
+        The number of solutions to be divided
     n_process : int
         The number of processes
-    n_threads : int
-        The number of threads that the program is using
 
     Return
     ------
-    None
+    list[tuple[int, int]]
+        The (begin, end) range of each process. There are never more
+        ranges than solutions
     
     """
-    remainder = len(solutions) % n_process
-    num_solutions = len(solutions) // n_process
-    process: list[Process] = []
+    n_process = min(n_process, n_solutions)
+    if n_process == 0:
+        return []
+
+    remainder = n_solutions % n_process
+    num_solutions = n_solutions // n_process
+    ranges = []
     begin = 0
     for i in range(n_process):
         end = begin + num_solutions
@@ -110,38 +377,684 @@ def create_process(solutions: list[list[list[int]]], n_process: int, n_threads:
             end += 1
             remainder -= 1
 
-        process.append(Process(target=validation_func, args=(solutions[begin:end], begin + 1, n_threads)))
+        ranges.append((begin, end))
         begin = end
 
+    return ranges
+
+
+def process_settings() -> dict:
+    """ Returns the settings of the main process that the processes created
+    by it must use. They are passed explicitly, since the processes started
+    by a forkserver (--fast-start) do not inherit them
+    """
+    return {"output": results_output.settings, "validation": validate_game.get_settings(), "first_result": first_result}
+
+
+def configure_process(settings: dict) -> None:
+    """ Applies the settings of process_settings in a process created by this program """
+    results_output.configure(**settings["output"])
+    validate_game.configure(settings["validation"])
+
+
+def report_first_result(settings: dict) -> None:
+    """ Sends to the main process the instant of the first result written
+    by this process, if it is earlier than the ones already received
+    """
+    shared = settings["first_result"]
+    if shared is None or results_output.first_write is None:
+        return
+
+    with shared.get_lock():
+        if shared.value == 0 or results_output.first_write < shared.value:
+            shared.value = results_output.first_write
+
+
+def run_validation(validation_func, settings: dict, solutions: numpy.ndarray | GridList, solution_number: int, n_threads: int) -> None:
+    """ Runs a validation strategy in a process created by this program,
+    configuring its output (see results_output.py)
+
+    Parameters
+    ----------
+    validation_func : function
+        The validation strategy (see validate_game.py)
+    settings : dict
+        The settings of the main process (see process_settings)
+    solutions : numpy.ndarray | GridList
+        The solutions to be validated
+    solution_number : int
+        The number of the first puzzle
+    n_threads : int
+        The number of threads that the program is using
+
+    Return
+    ------
+    None
+    
+    """
+    configure_process(settings)
+    instrumentation.run_profiled(validation_func, solutions, solution_number, n_threads)
+    results_output.flush()
+    report_first_result(settings)
+    instrumentation.report()
+    if isinstance(validate_game.cache, result_cache.ResultCache):
+        result_cache.report(validate_game.cache, current_process().name)
+
+
+def start_processes(solutions: GridList, first_solution: int, n_process: int, n_threads: int, validation_func) -> list[multiprocessing.Process]:
+    """ Divides the solutions between the processes and starts them
+
+    Parameters
+    ----------
+    solutions : GridList
+        The solutions to be divided
+    first_solution : int
+        The index of the first solution of the list in the input file
+    n_process : int
+        The number of processes
+    n_threads : int
+        The number of threads that the program is using
+
+    Return
+    ------
+    list[multiprocessing.Process]
+        The processes started
+    
+    """
+    process: list[multiprocessing.Process] = []
+    for i, (begin, end) in enumerate(split_solutions(len(solutions), n_process)):
+        process.append(context.Process(
+            target=run_validation,
+            args=(validation_func, process_settings(), solutions[begin:end], first_solution + begin + 1, n_threads),
+            name=f"Process-{i+1}"
+        ))
+
     for proc in process:
         proc.start()
 
+    return process
+
+
+def validate_shared_solutions(validation_func, settings: dict, shm_name: str, n_solutions: int, begin: int, end: int, n_threads: int) -> None:
+    """ Attaches to the shared memory block created by create_process_shared
+    and validates the solutions in the range [begin, end). The strategies
+    of validate_game.ARRAY_STRATEGIES validate a view of the block; the
+    others receive a copy of the range as a GridList
+
+    Parameters
+    ----------
+    validation_func : function
+        The validation strategy (see validate_game.py)
+    settings : dict
+        The settings of the main process (see process_settings)
+    shm_name : str
+        The name of the shared memory block
+    n_solutions : int
+        The number of solutions in the block
+    begin : int
+        The index of the first solution of this process
+    end : int
+        The index after the last solution of this process
+    n_threads : int
+        The number of threads that the program is using
+
+    Return
+    ------
+    None
+    
+    """
+    import numpy
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        solutions = numpy.ndarray((n_solutions, 9, 9), dtype=numpy.uint8, buffer=shm.buf)[begin:end]
+        if validation_func not in validate_game.ARRAY_STRATEGIES:
+            # Grid e GridList guardam bytes, que o cache e as validações usam como chaves e concatenam,
+            # e não uma view do bloco: o intervalo deste processo é copiado uma vez
+            solutions = GridList.from_array(solutions)
+
+        run_validation(validation_func, settings, solutions, begin + 1, n_threads)
+        del solutions # a view of the block must not outlive it
+    finally:
+        shm.close()
+
+
+@contextmanager
+def shared_solutions(solutions: numpy.ndarray | GridList) -> Iterator[tuple[str, int]]:
+    """ Copies the solutions into a shared memory block, which is
+    released when the context is exited
+
+    Parameters
+    ----------
+    solutions : numpy.ndarray | GridList
+        The list of all of the solutions
+
+    Return
+    ------
+    Iterator[tuple[str, int]]
+        The name of the block and the number of solutions in it
+    
+    """
+    import numpy
+    solutions = validations.solutions_to_array(solutions)
+    shm = shared_memory.SharedMemory(create=True, size=max(solutions.nbytes, 1))
+    try:
+        shared = numpy.ndarray(solutions.shape, dtype=numpy.uint8, buffer=shm.buf)
+        shared[:] = solutions
+        del shared
+
+        yield shm.name, len(solutions)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def create_process(solutions: GridList, n_process: int, n_threads: int, validation_func) -> None:
+    """ Creates the processes
+
+    Parameters
+    ----------
+    solutions : GridList
+        The list of all of the solutions
+    n_process : int
+        The number of processes
+    n_threads : int
+        The number of threads that the program is using
+
+    Return
+    ------
+    None
+    
+    """
+    for proc in start_processes(solutions, 0, n_process, n_threads, validation_func):
+        proc.join()
+
+
+def create_process_shared(solutions: numpy.ndarray | GridList, n_process: int, n_threads: int, validation_func) -> None:
+    """ Copies the solutions into one shared memory block and creates the
+    processes, which receive only the range of solutions that they validate.
+    Nothing is pickled to send the solutions, but only the array strategies
+    validate them in place: the others copy their range out of the block
+    (see validate_shared_solutions)
+
+    Parameters
+    ----------
+    solutions : numpy.ndarray | GridList
+        The list of all of the solutions
+    n_process : int
+        The number of processes
+    n_threads : int
+        The number of threads that the program is using
+
+    Return
+    ------
+    None
+    
+    """
+    with shared_solutions(solutions) as (shm_name, n_solutions):
+        process: list[multiprocessing.Process] = []
+        for i, (begin, end) in enumerate(split_solutions(n_solutions, n_process)):
+            process.append(context.Process(
+                target=validate_shared_solutions,
+                args=(validation_func, process_settings(), shm_name, n_solutions, begin, end, n_threads),
+                name=f"Process-{i+1}"
+            ))
+
+        for proc in process:
+            proc.start()
+
+        for proc in process:
+            proc.join()
+
+
+def capture_validation(validation_func, solutions: numpy.ndarray | GridList, solution_number: int, n_threads: int, output_mode: str = results_output.OUTPUT_ALL) -> str:
+    """ Runs a validation strategy, returning what it prints instead of
+    writing it to stdout
+
+    Parameters
+    ----------
+    validation_func : function
+        The validation strategy (see validate_game.py)
+    solutions : numpy.ndarray | GridList
+        The solutions to be validated
+    solution_number : int
+        The number of the first puzzle
+    n_threads : int
+        The number of threads that the program is using
+    output_mode : str
+        One of results_output.OUTPUT_MODES
+
+    Return
+    ------
+    str
+        The output of the strategy
+    
+    """
+    output = StringIO()
+    # é por aqui que validam os processos de --work-stealing e --pipeline (ver instrumentation.profiled)
+    with redirect_stdout(output), instrumentation.profiled():
+        results_output.configure(output_mode, maxsize)
+        validation_func(solutions, solution_number, n_threads)
+        results_output.flush()
+
+    return output.getvalue()
+
+
+def steal_work(validation_func, settings: dict, shm_name: str, n_solutions: int, next_solution, chunk_size: int, n_threads: int, results: Queue) -> None:
+    """ Takes chunks of solutions from the shared memory block until all
+    of them have been taken, sending the output of each chunk to `results`
+
+    Parameters
+    ----------
+    validation_func : function
+        The validation strategy (see validate_game.py)
+    settings : dict
+        The settings of the main process (see process_settings)
+    shm_name : str
+        The name of the shared memory block
+    n_solutions : int
+        The number of solutions in the block
+    next_solution : multiprocessing.Value
+        Shared counter with the index of the next solution not taken yet
+    chunk_size : int
+        The number of solutions taken at a time
+    n_threads : int
+        The number of threads that the program is using
+    results : multiprocessing.Queue
+        Receives (chunk index, output of the chunk)
+
+    Return
+    ------
+    None
+    
+    """
+    import numpy
+    validate_game.configure(settings["validation"])
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        grids = numpy.ndarray((n_solutions, 9, 9), dtype=numpy.uint8, buffer=shm.buf)
+        while True:
+            with next_solution.get_lock():
+                begin = next_solution.value
+                next_solution.value += chunk_size
+
+            if begin >= n_solutions:
+                break
+
+            solutions = grids[begin:begin + chunk_size]
+            if validation_func not in validate_game.ARRAY_STRATEGIES:
+                solutions = GridList.from_array(solutions)
+
+            # a saída é guardada para que o processo principal a imprima na ordem dos quebra-cabeças
+            output = capture_validation(validation_func, solutions, begin + 1, n_threads, settings["output"]["mode"])
+            results.put((begin // chunk_size, output))
+            del solutions
+
+        del grids # a view of the block must not outlive it
+    finally:
+        shm.close()
+
+    instrumentation.report()
+
+
+def create_process_work_stealing(solutions: numpy.ndarray | GridList, n_process: int, n_threads: int, validation_func, chunk_size: int) -> None:
+    """ Creates the processes, which take chunks of chunk_size solutions
+    from a shared counter until there are no more solutions, instead of
+    receiving a fixed range. The output is printed in the order of the puzzles
+
+    Parameters
+    ----------
+    solutions : numpy.ndarray | GridList
+        The list of all of the solutions
+    n_process : int
+        The number of processes
+    n_threads : int
+        The number of threads that the program is using
+    chunk_size : int
+        The number of solutions taken by a process at a time
+
+    Return
+    ------
+    None
+    
+    """
+    with shared_solutions(solutions) as (shm_name, n_solutions):
+        n_chunks = (n_solutions + chunk_size - 1) // chunk_size
+        next_solution = context.Value("q", 0)
+        results = context.Queue()
+
+        process: list[multiprocessing.Process] = []
+        for i in range(min(n_process, n_chunks)):
+            process.append(context.Process(
+                target=steal_work,
+                args=(validation_func, process_settings(), shm_name, n_solutions, next_solution, chunk_size, n_threads, results),
+                name=f"Process-{i+1}"
+            ))
+
+        for proc in process:
+            proc.start()
+
+        # imprime os chunks na ordem, guardando os que chegaram antes da sua vez
+        finished_chunks: dict[int, str] = {}
+        chunk_to_print = 0
+        while chunk_to_print < n_chunks:
+            try:
+                chunk_index, output = results.get(timeout=1)
+            except Empty:
+                if not any(proc.is_alive() for proc in process):
+                    print("Um processo terminou sem validar todos os quebra-cabeças", file=stderr)
+                    break
+                continue
+
+            finished_chunks[chunk_index] = output
+            while chunk_to_print in finished_chunks:
+                print(finished_chunks.pop(chunk_to_print), end="", flush=True)
+                results_output.note_write()
+                chunk_to_print += 1
+
+        for proc in process:
+            proc.join()
+
+
+def verdicts(solutions: numpy.ndarray | GridList) -> numpy.ndarray:
+    """ Returns if each solution is valid, stopping each puzzle at its first
+    error, without the errors, the threads or the output of the strategies
+
+    Parameters
+    ----------
+    solutions : numpy.ndarray | GridList
+        The solutions, as an array they are checked by validations.valid_batch,
+        as a GridList by validations.is_valid
+
+    Return
+    ------
+    numpy.ndarray
+        bool array with one verdict for each solution
+    """
+    import numpy
+    with instrumentation.profiled():
+        if isinstance(solutions, numpy.ndarray):
+            return validations.valid_batch(solutions)
+
+        return numpy.fromiter((validations.is_valid(solution) for solution in solutions), dtype=bool, count=len(solutions))
+
+
+def create_process_verdicts(solutions: numpy.ndarray | GridList, n_process: int) -> numpy.ndarray:
+    """ Divides the solutions between n_process processes, which return the
+    verdicts of their solutions (see verdicts)
+
+    Return
+    ------
+    numpy.ndarray
+        bool array with one verdict for each solution, in order
+    """
+    import numpy
+    ranges = split_solutions(len(solutions), n_process)
+    # com um processo ou menos (um arquivo vazio não tem nenhum intervalo), não há o que dividir
+    if len(ranges) <= 1:
+        return verdicts(solutions)
+
+    with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context) as pool:
+        parts = pool.map(verdicts, [solutions[begin:end] for begin, end in ranges])
+        return numpy.concatenate(list(parts))
+
+
+def iter_file_chunks(file: str, chunk_size: int, as_array: bool) -> Iterator[numpy.ndarray | GridList]:
+    """ Read the input file lazily, in the text or in the binary format
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+    chunk_size : int
+        maximum number of solutions in each chunk
+    as_array : bool
+        If the chunks of a binary file are yielded as numpy.ndarray
+        instead of GridList
+
+    Return
+    ------
+    Iterator[numpy.ndarray | GridList]
+        The chunks of the file, in order
+
+    """
+    if not binary_format.is_binary(file):
+        try:
+            yield from iter_chunks(file, chunk_size)
+        except ValueError as error:
+            print(error)
+            exit(1)
+        return
+
+    try:
+        for chunk in binary_format.iter_binary_chunks(file, chunk_size):
+            yield chunk if as_array else GridList.from_array(chunk)
+    except ValueError as error:
+        print(f"Arquivo binário inválido: {error}")
+        exit(1)
+
+
+def create_process_streaming(file: str, n_process: int, n_threads: int, validation_func, chunk_size: int) -> None:
+    """ Reads the input file in chunks and validates each chunk with
+    n_process processes, so only two chunks are kept in memory at once.
+    The next chunk is parsed while the processes validate the current one.
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+    n_process : int
+        The number of processes
+    n_threads : int
+        The number of threads that the program is using
+    chunk_size : int
+        The number of solutions read from the file at a time
+
+    Return
+    ------
+    None
+    
+    """
+    process: list[multiprocessing.Process] = []
+    first_solution = 0
+    as_array = validation_func in validate_game.ARRAY_STRATEGIES
+    for chunk in iter_file_chunks(file, chunk_size, as_array):
+        for proc in process:
+            proc.join()
+
+        process = start_processes(chunk, first_solution, n_process, n_threads, validation_func)
+        first_solution += len(chunk)
+
     for proc in process:
         proc.join()
 
 
+def use_forkserver() -> None:
+    """ Makes the processes created afterwards be started by a forkserver
+    that has already imported this file, validate_game and validations, so
+    each process is a fork of it instead of a new interpreter that imports
+    them again (--fast-start). Nothing changes where the processes are
+    already created with fork
+    """
+    global context
+    # onde fork é o padrão (Linux até o Python 3.13), ele já é a forma mais
+    # rápida de iniciar os processos, que herdam os módulos já importados
+    if multiprocessing.get_start_method() == "fork":
+        return
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["__main__", "validate_game", "validations"])
+
+
+def startup_report() -> None:
+    """ Writes to stderr the time from the start of this program until the
+    first result was written, by any process, and until the end (--startup-report)
+    """
+    instants = [instant for instant in (results_output.first_write, first_result.value or None) if instant is not None]
+    end = time()
+    first = f"{1000 * (min(instants) - START_TIME):.1f} ms" if instants else "nenhum"
+    print(f"[início] primeiro resultado: {first}, fim: {1000 * (end - START_TIME):.1f} ms "
+          f"(início de processos: {context.get_start_method()})", file=stderr)
+
+
 
 if __name__ == "__main__":
-    NUM_VALIDATIONS = 27
+    argv, options = parse_options(argv)
     file, n_process, n_threads = validate_input(argv)
-    solutions = read_file(file)
 
-    if n_process > len(solutions):
-        n_process = len(solutions)
+    # com --box-size=n, o arquivo tem tabuleiros de n² x n² células, validados por boards.py
+    box_size = int_option(options, "box-size", 3)
+    if "box-size" in options:
+        unsupported = [f"--{name}" for name in BOX_SIZE_UNSUPPORTED if name in options]
+        if binary_format.is_binary(file):
+            unsupported.append("arquivos binários")
+        if len(argv) > 4:
+            # boards.py tem uma única validação, com as restrições divididas entre as threads
+            unsupported.append(f"a estratégia {argv[4]}")
+        if unsupported:
+            print(f"--box-size não pode ser usado com {', '.join(unsupported)}")
+            exit(1)
 
+    NUM_VALIDATIONS = 3 * box_size ** 2
     if n_threads > NUM_VALIDATIONS:
         n_threads = NUM_VALIDATIONS
 
 
-    validation_func = validate_game.validate_many_games_at_once
+    validation_func = validate_game.DEFAULT_STRATEGY
     if len(argv) > 4:
-        if argv[4] == "validate_game_creating_threads_once":
-            validation_func = validate_game.validate_game_creating_threads_once
-        elif argv[4] == "validate_game_creating_threads_once_and_using_thread_pool":
-            validation_func = validate_game.validate_game_creating_threads_once_and_using_thread_pool
-        elif argv[4] == "validate_game_thread_pool_executor":
-            validation_func = validate_game.validate_game_thread_pool_executor
-        elif argv[4] == "validate_game_sequentially":
-            validation_func = validate_game.validate_game_sequentially
-
-    create_process(solutions, n_process, n_threads, validation_func)
+        validation_func = validate_game.STRATEGIES.get(argv[4], validate_game.DEFAULT_STRATEGY)
+
+    output_mode = options.get("output", results_output.OUTPUT_ALL)
+    if output_mode not in results_output.OUTPUT_MODES:
+        print(f"O valor de --output deve ser um destes: {', '.join(results_output.OUTPUT_MODES)}")
+        exit(1)
+    block_size = int_option(options, "block-size", 256)
+
+    # com --auto, a estratégia, os processos, as threads e o tamanho dos lotes são escolhidos por calibração
+    if "auto" in options:
+        import autotune
+        choice = autotune.tune(file, n_threads, output_mode, block_size, options.get("tune-cache"))
+        validation_func = validate_game.STRATEGIES[choice["strategy"]]
+        n_process, n_threads = choice["n_process"], choice["n_threads"]
+        if choice["batch_size"] is not None:
+            validate_game.set_batch_size(validation_func, choice["batch_size"])
+
+    if "batch-size" in options:
+        validate_game.set_batch_size(validation_func, int_option(options, "batch-size", 1))
+
+    if "instrument" in options or "profile-dir" in options:
+        instrumentation.enable(options.get("profile-dir"))
+
+    # com --fast-start, os processos são criados por um forkserver com os módulos já importados,
+    # e os arquivos de texto pequenos são lidos sem numpy (a calibração de --auto já foi feita)
+    fast_start = "fast-start" in options
+    if fast_start:
+        use_forkserver()
+
+    if "startup-report" in options:
+        first_result = context.Value("d", 0.0)
+
+    # a entrada é lida e verificada antes de criar o processo de escrita de --ordered e o
+    # gerenciador de --shared-cache; os modos --stream e --pipeline a leem durante a validação
+    solutions = None
+    if "box-size" in options:
+        solutions = boards.read_boards(file, box_size)
+    elif "verdict" in options or "verdict-bitmap" in options:
+        import numpy
+        solutions = load_solutions(file)
+        if isinstance(solutions, numpy.ndarray) and validation_func not in validate_game.ARRAY_STRATEGIES:
+            solutions = GridList.from_array(solutions)
+    elif "work-stealing" in options or "shared-memory" in options:
+        solutions = load_solutions(file)
+    elif "pipeline" not in options and "stream" not in options:
+        # os arquivos pequenos são validados antes que importar numpy compense
+        use_numpy = not fast_start or validation_func in validate_game.ARRAY_STRATEGIES or getsize(file) > FAST_START_MAX_SIZE
+        solutions = load_solutions(file, use_numpy)
+        if not isinstance(solutions, GridList) and validation_func not in validate_game.ARRAY_STRATEGIES:
+            solutions = GridList.from_array(solutions)
+
+    cache_manager = None
+    writer = None
+    output_queue = None
+    # o processo de escrita e o gerenciador do cache são encerrados mesmo se a validação falhar
+    try:
+        # com --cache=N, os resultados de quebra-cabeças repetidos são reaproveitados (ver result_cache.py)
+        if "cache" in options or "shared-cache" in options:
+            cache_size = int_option(options, "cache", 100000)
+            if "shared-cache" in options:
+                cache_manager = result_cache.CacheManager(ctx=context)
+                cache_manager.start()
+                validate_game.cache = cache_manager.ResultCache(cache_size)
+            else:
+                validate_game.cache = result_cache.ResultCache(cache_size)
+
+        # com --backend, os processos podem ser substituídos por threads ou subinterpretadores (ver backends.py)
+        backend = options.get("backend", backends.BACKEND_PROCESSES)
+        if backend not in backends.BACKENDS:
+            print(f"O valor de --backend deve ser um destes: {', '.join(backends.BACKENDS)}")
+            exit(1)
+        backend = backends.choose_backend(backend)
+        if backend == backends.BACKEND_SUBINTERPRETERS and validation_func in validate_game.ARRAY_STRATEGIES:
+            print("As estratégias com numpy não rodam em subinterpretadores; usando processos", file=stderr)
+            backend = backends.BACKEND_PROCESSES
+        if backend == backends.BACKEND_SUBINTERPRETERS and instrumentation.PROFILE_DIR is not None:
+            print("Os subinterpretadores não podem ser perfilados; usando processos", file=stderr)
+            backend = backends.BACKEND_PROCESSES
+        if backend != backends.BACKEND_PROCESSES and validate_game.cache is not None:
+            # o cache grava a saída trocando o writer do processo, que as threads compartilham,
+            # e os subinterpretadores não têm acesso a ele
+            print("O cache de resultados só funciona com processos; usando processos", file=stderr)
+            backend = backends.BACKEND_PROCESSES
+
+        # com --ordered, um único processo escreve a saída na ordem dos quebra-cabeças
+        if "ordered" in options:
+            output_queue = context.Queue()
+            writer = context.Process(target=results_output.write_ordered, args=(output_queue, block_size), name="Writer")
+            writer.start()
+        results_output.configure(output_mode, block_size, output_queue)
+
+        if "box-size" in options:
+            create_process(solutions, n_process, n_threads, boards.validate_boards)
+        # com --verdict ou --verdict-bitmap, só se cada quebra-cabeças é válido ou não é calculado
+        elif "verdict" in options or "verdict-bitmap" in options:
+            valid = create_process_verdicts(solutions, n_process)
+
+            if "verdict-bitmap" in options:
+                # um bit por quebra-cabeças, 1 para os válidos, começando pelo bit mais significativo
+                with open(options["verdict-bitmap"], "wb") as f:
+                    f.write(numpy.packbits(valid).tobytes())
+            else:
+                stdout.write(numpy.where(valid, ord("1"), ord("0")).astype(numpy.uint8).tobytes().decode() + "\n")
+
+            n_valid = int(valid.sum())
+            print(f"{len(valid)} quebra-cabeças: {n_valid} válidos, {len(valid) - n_valid} inválidos")
+        elif "pipeline" in options:
+            chunk_size = int_option(options, "chunk-size", 5000)
+            import asyncio
+            import pipeline
+            asyncio.run(pipeline.run_pipeline(file, n_process, n_threads, validation_func, chunk_size, output_mode, context))
+        elif "stream" in options:
+            chunk_size = int_option(options, "chunk-size", 50000)
+            create_process_streaming(file, n_process, n_threads, validation_func, chunk_size)
+        elif "work-stealing" in options:
+            chunk_size = int_option(options, "chunk-size", 64)
+            create_process_work_stealing(solutions, n_process, n_threads, validation_func, chunk_size)
+        elif "shared-memory" in options:
+            create_process_shared(solutions, n_process, n_threads, validation_func)
+        elif backend == backends.BACKEND_THREADS:
+            backends.run_threads(validation_func, solutions, split_solutions(len(solutions), n_process), n_threads)
+        elif backend == backends.BACKEND_SUBINTERPRETERS:
+            backends.run_subinterpreters(validation_func.__name__, solutions, split_solutions(len(solutions), n_process), n_threads, output_mode)
+        else:
+            create_process(solutions, n_process, n_threads, validation_func)
+
+        if cache_manager is not None:
+            result_cache.report(validate_game.cache, "compartilhado")
+    finally:
+        if writer is not None:
+            output_queue.put(None)
+            writer.join()
+
+        if cache_manager is not None:
+            cache_manager.shutdown()
+
+    if first_result is not None:
+        startup_report()
@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import sys
+import main
+import results_output
+import validate_game
+
+## Pipeline mode (--pipeline): reading, validation and writing at the same time
+#
+# Three stages run concurrently in an asyncio event loop:
+#   - the reader parses the input file in chunks, in a thread, and sends each
+#     chunk to a process pool (run_in_executor);
+#   - the pool processes validate the chunks, returning their output;
+#   - the writer takes the results in the order of the chunks and writes them
+#     through an AsyncWriter, which buffers the text and writes it in a thread.
+# The queue between the reader and the writer is bounded, so when the writer
+# (or the pool) is slower, the reader waits instead of keeping the whole file
+# in memory, and the total time approaches the time of the slowest stage.
+#
+# The chunks are validated as "Processo N", where N goes from 1 to the number
+# of processes, in turns.
+
+WRITE_BUFFER_SIZE = 1 << 16 # bytes de saída acumulados antes de cada escrita
+
+
+class AsyncWriter:
+    """ Buffered writer of stdout for the event loop. The writes are done by
+    a single thread, in order, and `write` waits for them when the buffer is
+    full, so a slow stdout slows down whoever writes
+    """
+
+    def __init__(self, buffer_size: int = WRITE_BUFFER_SIZE) -> None:
+        self.buffer_size = buffer_size
+        self.buffer: list[str] = []
+        self.size = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Writer")
+
+    async def write(self, text: str) -> None:
+        self.buffer.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        text = "".join(self.buffer)
+        self.buffer = []
+        self.size = 0
+        if text:
+            await asyncio.get_running_loop().run_in_executor(self.executor, write_stdout, text)
+
+    async def close(self) -> None:
+        await self.flush()
+        self.executor.shutdown()
+
+
+def write_stdout(text: str) -> None:
+    sys.stdout.write(text)
+    sys.stdout.flush()
+    results_output.note_write()
+
+
+def validate_chunk(strategy: str, solutions, solution_number: int, n_threads: int, process_number: int, output_mode: str) -> str:
+    """ Validates a chunk in a pool process, returning its output
+
+    Parameters
+    ----------
+    strategy : str
+        The name of the validation strategy (see validate_game.STRATEGIES)
+    solutions : numpy.ndarray | GridList
+        The solutions of the chunk
+    solution_number : int
+        The number of the first puzzle of the chunk
+    n_threads : int
+        The number of threads that the program is using
+    process_number : int
+        The number printed as "Processo N"
+    output_mode : str
+        One of results_output.OUTPUT_MODES
+
+    Return
+    ------
+    str
+        The output of the strategy
+    """
+    validate_game.worker.process_number = str(process_number)
+    return main.capture_validation(validate_game.STRATEGIES[strategy], solutions, solution_number, n_threads, output_mode)
+
+
+async def read_and_submit(file: str, chunk_size: int, n_process: int, n_threads: int, validation_func, output_mode: str,
+                          pool: ProcessPoolExecutor, pending: asyncio.Queue) -> None:
+    """ Parses the chunks of the input file and submits them to the pool,
+    putting the futures in `pending`, in order, and None at the end
+    """
+    loop = asyncio.get_running_loop()
+    chunks = main.iter_file_chunks(file, chunk_size, validation_func in validate_game.ARRAY_STRATEGIES)
+    first_solution = 1
+    i = 0
+    while True:
+        # o parsing roda em uma thread, para não bloquear o laço de eventos
+        chunk = await loop.run_in_executor(None, next, chunks, None)
+        if chunk is None:
+            break
+
+        future = loop.run_in_executor(pool, validate_chunk, validation_func.__name__, chunk, first_solution, n_threads, i % n_process + 1, output_mode)
+        await pending.put(future) # espera quando há chunks demais em andamento
+        first_solution += len(chunk)
+        i += 1
+
+    await pending.put(None)
+
+
+async def write_results(pending: asyncio.Queue, writer: AsyncWriter) -> None:
+    """ Writes the output of the chunks in the order they were submitted """
+    while True:
+        future = await pending.get()
+        if future is None:
+            break
+
+        await writer.write(await future)
+
+    await writer.close()
+
+
+async def run_pipeline(file: str, n_process: int, n_threads: int, validation_func, chunk_size: int, output_mode: str, context=None) -> None:
+    """ Validates the input file with the three stages running at the same time
+
+    Parameters
+    ----------
+    file : str
+        path to the input file
+    n_process : int
+        The number of processes of the pool
+    n_threads : int
+        The number of threads that the program is using
+    validation_func : function
+        The validation strategy (see validate_game.py)
+    chunk_size : int
+        The number of solutions in each chunk
+    output_mode : str
+        One of results_output.OUTPUT_MODES
+    context : multiprocessing.context.BaseContext
+        The context of the processes of the pool (see main.use_forkserver)
+
+    Return
+    ------
+    None
+    """
+    # até dois chunks por processo: um sendo validado e outro esperando
+    pending = asyncio.Queue(maxsize=2 * n_process)
+    # as configurações de validate_game são passadas aos processos, que não as herdam de um forkserver
+    with ProcessPoolExecutor(max_workers=n_process, mp_context=context,
+                             initializer=validate_game.configure, initargs=(validate_game.get_settings(),)) as pool:
+        await asyncio.gather(
+            read_and_submit(file, chunk_size, n_process, n_threads, validation_func, output_mode, pool, pending),
+            write_results(pending, AsyncWriter())
+        )
@@ -0,0 +1,112 @@
+from sys import stderr
+from threading import Lock
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+from grid import GridList
+
+## Cache of the results of the validations, indexed by the content of the puzzles
+#
+# Enabled with the options --cache=N (the maximum number of puzzles kept) and
+# --shared-cache of main.py. Each result is kept under the 81 bytes of the
+# digits of its puzzle, so a repeated puzzle is not validated again: its
+# result is printed as it was printed the first time (see validate_game.cached).
+# When the cache is full, the result used least recently is discarded.
+#
+# Without --shared-cache, each process has its own cache. With it, a single
+# cache is kept by a manager process (CacheManager) and every process uses it,
+# with one request for each chunk of puzzles instead of one for each puzzle.
+
+
+class ResultCache:
+    """ LRU cache of results, with counters of hits and misses
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of results kept
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.entries: OrderedDict[bytes, tuple[int, str]] = OrderedDict()
+        self.lock = Lock() # o gerenciador atende cada processo em uma thread
+        self.hits = 0
+        self.misses = 0
+
+    def __reduce__(self):
+        # cada processo tem o seu cache: a cópia enviada a outro processo começa vazia
+        return ResultCache, (self.max_size,)
+
+    def lookup(self, keys: list[bytes]) -> dict[bytes, tuple[int, str]]:
+        """ Returns the results found for the keys """
+        found = {}
+        with self.lock:
+            for key in keys:
+                result = self.entries.get(key)
+                if result is not None:
+                    self.entries.move_to_end(key)
+                    found[key] = result
+
+        return found
+
+    def count(self, hits: int, misses: int) -> None:
+        """ Counts the puzzles that were not validated (hits) and the
+        ones that were validated (misses)
+        """
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+
+    def store(self, results: dict[bytes, tuple[int, str]]) -> None:
+        """ Keeps new results, discarding the least recently used ones
+        if there are more than max_size
+        """
+        with self.lock:
+            self.entries.update(results)
+            for key in results:
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> tuple[int, int, int]:
+        """ Returns the hits, the misses and the number of results kept """
+        with self.lock:
+            return self.hits, self.misses, len(self.entries)
+
+
+class CacheManager(BaseManager):
+    """ Manager process that keeps a ResultCache shared by the processes """
+
+
+CacheManager.register("ResultCache", ResultCache)
+
+
+def grid_keys(solutions) -> list[bytes]:
+    """ Returns the key of each puzzle: the bytes of its 81 digits
+
+    Parameters
+    ----------
+    solutions : numpy.ndarray | GridList
+        The puzzles
+
+    Return
+    ------
+    list[bytes]
+        One key for each puzzle
+    """
+    if isinstance(solutions, GridList):
+        cells = solutions.cells
+        return [cells[begin:begin + 81] for begin in range(0, len(cells), 81)]
+
+    import numpy
+    cells = numpy.ascontiguousarray(solutions, dtype=numpy.uint8).reshape(len(solutions), 81)
+    return [row.tobytes() for row in cells]
+
+
+def report(cache, name: str) -> None:
+    """ Writes the counters of a cache to stderr """
+    hits, misses, size = cache.stats()
+    total = hits + misses
+    rate = 100 * hits / total if total > 0 else 0
+    print(f"[cache] {name}: {hits} acertos, {misses} falhas ({rate:.1f}% de acertos), "
+          f"{size} resultados guardados", file=stderr)
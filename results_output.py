@@ -0,0 +1,201 @@
+import sys
+from threading import Lock
+from time import time
+from multiprocessing import Queue
+from contextlib import contextmanager
+from typing import Iterator
+
+## This is a file with the functions that write the output of the validations
+#
+# Each process has one ResultWriter (`writer`), configured by main.py before the
+# validations start. The lines are kept in a buffer and written in blocks of
+# `block_size` lines, instead of one print for each line. When a queue is given,
+# the lines are sent, grouped by puzzle, to a single writer process
+# (write_ordered), which prints them in the order of the puzzles.
+
+OUTPUT_ALL = "all"       # progress lines and results
+OUTPUT_QUIET = "quiet"   # only the results
+OUTPUT_ERRORS = "errors" # only the results of puzzles with errors
+OUTPUT_MODES = (OUTPUT_ALL, OUTPUT_QUIET, OUTPUT_ERRORS)
+
+
+class ResultWriter:
+    """ Buffers the output of the validations of one process """
+
+    def __init__(self, mode: str = OUTPUT_ALL, block_size: int = 1, queue: Queue = None) -> None:
+        self.mode = mode
+        self.block_size = block_size
+        self.queue = queue
+        self.lock = Lock() # a estratégia validate_many_games_at_once escreve a partir de duas threads
+        self.lines: list[str] = []
+        self.progress_lines: dict[int, str] = {}
+
+    def progress(self, process_number: int | str, solution_number: int) -> None:
+        """ Writes the line indicating that a puzzle started to be validated """
+        # só o modo "all" escreve estas linhas; result não depende delas nos outros modos
+        if self.mode != OUTPUT_ALL:
+            return
+
+        line = f"Processo {process_number}: resolvendo quebra-cabeças {solution_number}\n"
+        with self.lock:
+            if self.queue is not None:
+                self.progress_lines[solution_number] = line
+            else:
+                self._add(line)
+
+    def result(self, solution_number: int | None, n_errors: int, line: str) -> None:
+        """ Writes the result of the validation of a puzzle """
+        line += "\n"
+        if self.mode == OUTPUT_ERRORS and n_errors == 0:
+            line = ""
+
+        with self.lock:
+            if self.queue is not None and solution_number is not None:
+                self._add((solution_number, self.progress_lines.pop(solution_number, "") + line))
+            elif line:
+                self._add(line)
+
+    def _add(self, item: str | tuple[int, str]) -> None:
+        self.lines.append(item)
+        if len(self.lines) >= self.block_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if len(self.lines) == 0:
+            return
+
+        if self.queue is not None:
+            self.queue.put(self.lines)
+        else:
+            # sys.stdout é procurado a cada escrita para respeitar redirect_stdout
+            sys.stdout.write("".join(self.lines))
+            sys.stdout.flush()
+        self.lines = []
+        note_write()
+
+    def flush(self) -> None:
+        """ Writes everything that is still in the buffer """
+        with self.lock:
+            self._flush()
+
+
+class ResultRecorder(ResultWriter):
+    """ Keeps the result of each puzzle instead of writing it
+    (see validate_game.cached)
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.results: dict[int, tuple[int, str]] = {} # número do quebra-cabeças: (erros, linha)
+
+    def progress(self, process_number: int | str, solution_number: int) -> None:
+        pass
+
+    def result(self, solution_number: int | None, n_errors: int, line: str) -> None:
+        with self.lock:
+            self.results[solution_number] = (n_errors, line)
+
+    def flush(self) -> None:
+        pass
+
+
+writer = ResultWriter()
+
+# instante (time.time()) em que este processo escreveu seu primeiro resultado, ou None
+first_write = None
+
+# configuração do writer, passada pelo processo principal para os processos que ele cria
+settings = {"mode": OUTPUT_ALL, "block_size": 1, "queue": None}
+
+
+def configure(mode: str = OUTPUT_ALL, block_size: int = 1, queue: Queue = None) -> None:
+    """ Replaces the writer of the current process and the settings
+    passed to the processes created by it
+
+    Parameters
+    ----------
+    mode : str
+        One of OUTPUT_MODES
+    block_size : int
+        The number of lines (or puzzles, when queue is given) written at a time
+    queue : Queue
+        If given, the output is sent to write_ordered instead of stdout
+
+    Return
+    ------
+    None
+    """
+    global writer, settings
+    writer.flush()
+    writer = ResultWriter(mode, block_size, queue)
+    settings = {"mode": mode, "block_size": block_size, "queue": queue}
+
+
+def note_write() -> None:
+    """ Keeps the instant of the first output written by this process
+    (see main.startup_report)
+    """
+    global first_write
+    if first_write is None:
+        first_write = time()
+
+
+def flush() -> None:
+    """ Writes everything that is still in the buffer of the writer """
+    writer.flush()
+
+
+@contextmanager
+def recording() -> Iterator[ResultRecorder]:
+    """ Context in which the results are kept by a ResultRecorder instead
+    of being written by the writer of the process. The writer is replaced
+    for every thread of the process, so only one validation can run while
+    recording (main.py does not use the cache with the threads backend)
+    """
+    global writer
+    previous = writer
+    writer = ResultRecorder()
+    try:
+        yield writer
+    finally:
+        writer = previous
+
+
+def write_ordered(queue: Queue, block_size: int) -> None:
+    """ Receives the output of the processes and prints it in the order of
+    the puzzles, starting from the puzzle 1, until None is received
+
+    Parameters
+    ----------
+    queue : Queue
+        Receives lists of (puzzle number, output of the puzzle)
+    block_size : int
+        The number of puzzles written at a time
+
+    Return
+    ------
+    None
+    """
+    waiting: dict[int, str] = {}
+    next_solution = 1
+    block = []
+    while True:
+        entries = queue.get()
+        if entries is None:
+            break
+
+        for solution_number, text in entries:
+            waiting[solution_number] = text
+
+        while next_solution in waiting:
+            block.append(waiting.pop(next_solution))
+            next_solution += 1
+
+            if len(block) >= block_size:
+                sys.stdout.write("".join(block))
+                block = []
+
+    # se algum quebra-cabeças não foi recebido, os seguintes são escritos mesmo assim
+    block.extend(waiting[solution_number] for solution_number in sorted(waiting))
+    sys.stdout.write("".join(block))
+    sys.stdout.flush()
@@ -0,0 +1,187 @@
+from sys import argv
+from concurrent.futures import ProcessPoolExecutor
+from socketserver import StreamRequestHandler, ThreadingUnixStreamServer
+from os import remove
+from os.path import exists
+import json
+import signal
+import multiprocessing
+import numpy
+import main
+import results_output
+import validate_game
+import validations
+from grid import GridList
+
+## Long-lived validation server
+#
+# Keeps a warm pool of validator processes and receives requests over a local
+# Unix socket, so the processes are not created (and numpy is not imported)
+# again for each input. See client.py.
+#
+# Each request is one JSON line with the fields:
+#   - "file": path to an input file (text or binary) or
+#     "grids": list of grids, each one a string with the 81 digits
+#   - "n_process", "n_threads" and "strategy", as in main.py
+#   - "output" (optional), as the option --output of main.py
+# The response is a sequence of JSON lines, {"output": "..."} with the output
+# of each process, in order, followed by {"done": true}, or a single
+# {"error": "..."}, and the connection is closed. A response without one of
+# them was cut short by a failure of the server.
+
+SOCKET_PATH = "/tmp/sudoku-validator.sock" # repetido em client.SOCKET_PATH
+
+
+def warm_up(_) -> None:
+    """ Runs a validation in a pool process, so the first request does not
+    pay for the imports and the creation of the process
+    """
+    validations.validate_grid([[1] * 9] * 9)
+
+
+def validate_range(strategy: str, solutions: numpy.ndarray | GridList, solution_number: int, n_threads: int, process_number: int, output_mode: str) -> str:
+    """ Validates the solutions of one process of a request in a pool process
+
+    Parameters
+    ----------
+    strategy : str
+        The name of the validation strategy (see validate_game.STRATEGIES)
+    solutions : numpy.ndarray | GridList
+        The solutions to be validated
+    solution_number : int
+        The number of the first puzzle
+    n_threads : int
+        The number of threads that the program is using
+    process_number : int
+        The number printed as "Processo N"
+    output_mode : str
+        One of results_output.OUTPUT_MODES
+
+    Return
+    ------
+    str
+        The output of the strategy
+    """
+    validation_func = validate_game.STRATEGIES.get(strategy, validate_game.DEFAULT_STRATEGY)
+
+    # as estratégias identificam o processo pelo nome, como em main.create_process
+    process = multiprocessing.current_process()
+    pool_name = process.name
+    process.name = f"Process-{process_number}"
+    try:
+        return main.capture_validation(validation_func, solutions, solution_number, n_threads, output_mode)
+    finally:
+        process.name = pool_name
+
+
+def parse_grids(grids: list[str]) -> numpy.ndarray:
+    """ Convert the grids of a request into an (N, 9, 9) array
+
+    Parameters
+    ----------
+    grids : list[str]
+        The grids, each one a string with the 81 digits
+
+    Return
+    ------
+    numpy.ndarray
+        uint8 array with shape (N, 9, 9)
+    """
+    data = "".join(grids).encode("ascii")
+    if any(len(grid) != 81 for grid in grids) or (len(data) > 0 and not data.isdigit()):
+        raise ValueError("cada quebra-cabeças deve ter 81 dígitos")
+
+    return (numpy.frombuffer(data, dtype=numpy.uint8) - ord("0")).reshape(-1, 9, 9)
+
+
+class ValidationHandler(StreamRequestHandler):
+    """ Handles one request, validating the grids in the pool of the server """
+
+    def send(self, **message) -> None:
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            n_process = int(request.get("n_process", 1))
+            n_threads = min(int(request.get("n_threads", 1)), validations.NUM_VALIDATIONS)
+            strategy = request.get("strategy", "")
+            output_mode = request.get("output", results_output.OUTPUT_ALL)
+
+            if output_mode not in results_output.OUTPUT_MODES:
+                raise ValueError(f"modo de saída desconhecido: {output_mode}")
+
+            if n_process < 1 or n_threads < 1:
+                raise ValueError("o número de threads e processos deve ser pelo menos 1")
+
+            if "grids" in request:
+                solutions = parse_grids(request["grids"])
+            elif exists(request.get("file", "")):
+                # main.load_solutions encerraria o servidor com exit(1) se o arquivo fosse inválido
+                solutions = main.read_solutions(request["file"])
+            else:
+                raise ValueError("o arquivo indicado não existe")
+        except (ValueError, TypeError, KeyError, OSError) as error:
+            self.send(error=str(error))
+            return
+
+        if validate_game.STRATEGIES.get(strategy, validate_game.DEFAULT_STRATEGY) not in validate_game.ARRAY_STRATEGIES:
+            solutions = GridList.from_array(solutions) if isinstance(solutions, numpy.ndarray) else solutions
+
+        futures = []
+        for i, (begin, end) in enumerate(main.split_solutions(len(solutions), n_process)):
+            futures.append(self.server.pool.submit(validate_range, strategy, solutions[begin:end], begin + 1, n_threads, i + 1, output_mode))
+
+        # as saídas são enviadas na ordem dos processos assim que ficam prontas
+        for future in futures:
+            self.send(output=future.result())
+        self.send(done=True)
+
+
+class ValidationServer(ThreadingUnixStreamServer):
+    """ Unix socket server that keeps a warm pool of validator processes """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, n_process: int) -> None:
+        self.pool = ProcessPoolExecutor(max_workers=n_process)
+        list(self.pool.map(warm_up, range(n_process)))
+        super().__init__(socket_path, ValidationHandler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown()
+
+
+if __name__ == "__main__":
+    argv, options = main.parse_options(argv)
+    if len(argv) < 2:
+        print("Uso: server.py [número de processos] [--socket=caminho]")
+        exit(1)
+
+    try:
+        n_process = int(argv[1])
+    except ValueError:
+        print("A quantidade de processos deve ser um número inteiro!")
+        exit(1)
+
+    if n_process < 1:
+        print("O número de processos deve ser pelo menos 1")
+        exit(1)
+
+    socket_path = options.get("socket", SOCKET_PATH)
+    if exists(socket_path):
+        remove(socket_path)
+
+    # SIGTERM encerra o servidor da mesma forma que Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    with ValidationServer(socket_path, n_process) as server:
+        print(f"Servidor ouvindo em {socket_path} com {n_process} processos")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            remove(socket_path)
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+import unittest
+from tempfile import TemporaryDirectory
+
+## Tests of main.py, run as the user runs it
+#
+# Uso: python -m unittest discover tests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_main(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "main.py", *args], cwd=ROOT, capture_output=True, text=True, timeout=120)
+
+
+class VerdictTest(unittest.TestCase):
+    """ --verdict and --verdict-bitmap """
+
+    def setUp(self) -> None:
+        self.tmp = TemporaryDirectory()
+        self.empty = os.path.join(self.tmp.name, "empty.txt")
+        open(self.empty, "w").close()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_empty_file_with_many_processes(self) -> None:
+        for n_process in ("1", "2", "4"):
+            result = run_main(self.empty, n_process, "1", "--verdict")
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn("0 quebra-cabeças: 0 válidos, 0 inválidos", result.stdout)
+
+    def test_empty_file_bitmap(self) -> None:
+        bitmap = os.path.join(self.tmp.name, "verdicts.bin")
+        result = run_main(self.empty, "2", "1", f"--verdict-bitmap={bitmap}")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(os.path.getsize(bitmap), 0)
+
+    def test_same_verdicts_with_any_number_of_processes(self) -> None:
+        input_file = os.path.join(ROOT, "input.txt")
+        expected = run_main(input_file, "1", "1", "--verdict").stdout
+        self.assertEqual(run_main(input_file, "3", "1", "--verdict").stdout, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
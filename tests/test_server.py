@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+from tempfile import TemporaryDirectory
+
+## Tests of server.py and client.py, run as the user runs them
+#
+# Uso: python -m unittest discover tests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ServerTest(unittest.TestCase):
+    """ Starts one server for all the tests, with its socket in a temporary directory """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = TemporaryDirectory()
+        cls.socket = os.path.join(cls.tmp.name, "server.sock")
+        cls.server = subprocess.Popen(
+            [sys.executable, "server.py", "2", f"--socket={cls.socket}"],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for _ in range(300):
+            if os.path.exists(cls.socket):
+                break
+            time.sleep(0.1)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.terminate()
+        cls.server.wait(30)
+        cls.tmp.cleanup()
+
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def run_client(self, file: str, *options: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, "client.py", file, "2", "2", "validate_game_sequentially", f"--socket={self.socket}", *options],
+            cwd=ROOT, capture_output=True, text=True, timeout=60
+        )
+
+    def test_valid_file(self) -> None:
+        result = self.run_client(os.path.join(ROOT, "input.txt"), "--output=quiet")
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("erros encontrados", result.stdout)
+
+    def test_incomplete_text_file(self) -> None:
+        with open(os.path.join(ROOT, "input.txt"), "rb") as f:
+            truncated = self.write("truncated.txt", f.read(300))
+
+        result = self.run_client(truncated)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("está incompleto", result.stdout)
+
+    def test_invalid_binary_file(self) -> None:
+        # o cabeçalho indica 5 quebra-cabeças, mas o arquivo tem só 3 bytes depois dele
+        bad = self.write("bad.bin", b"SDKB\x01\x01\x00\x00" + (5).to_bytes(8, "little") + b"abc")
+
+        result = self.run_client(bad)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("Arquivo binário inválido", result.stdout)
+
+    def test_empty_file(self) -> None:
+        result = self.run_client(self.write("empty.txt", b""))
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, "")
+
+    def test_server_still_answers_after_an_error(self) -> None:
+        self.run_client(self.write("bad2.bin", b"SDKB\x01\x01\x00\x00" + (5).to_bytes(8, "little")))
+        self.assertEqual(self.run_client(os.path.join(ROOT, "input.txt")).returncode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
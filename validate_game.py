@@ -1,11 +1,19 @@
 import multiprocessing
+import instrumentation
+import result_cache
+import results_output
 
 from queue import Queue
-from threading import Thread
-from validations import validate_column, validate_line, validate_region
+from collections import deque
+from threading import Thread, local
+from validations import validate_column, validate_line, validate_region, validate_grid, validate_batch, solutions_to_array, error_labels, current_thread_number
 from concurrent.futures import ThreadPoolExecutor, Future
-from SudokuThread import SudokuThread, Semaphore
+from SudokuThread import SudokuThread, GridWorker, Semaphore
+from grid import GridList, ValidationResult
 from typing import Callable
+from functools import wraps
+from time import perf_counter
+from array import array
 
 """
 This is a file with multiple Game validations functions,
@@ -13,6 +21,110 @@ create threads and print results functions.
 
 """
 
+# número do processo das threads que fazem o papel de processos (ver backends.py)
+worker = local()
+
+# cache de resultados usado por todas as estratégias (ver result_cache.py), ou None
+cache = None
+
+# quantidade de quebra-cabeças em cada tarefa de validate_game_task_ring
+RING_BATCH_SIZE = 32
+
+# quantidade de quebra-cabeças em cada tarefa de validate_many_games_at_once, ou None
+# para escolhê-la pelo tempo medido das tarefas (ver task_size)
+MANY_GAMES_BATCH_SIZE = None
+
+# duração desejada de cada tarefa de validate_many_games_at_once quando MANY_GAMES_BATCH_SIZE é None,
+# longa o bastante para que o custo de enviar a tarefa e receber o resultado seja pequeno
+TARGET_TASK_TIME = 0.002 # segundos
+FIRST_TASK_SIZE = 8
+
+# quantidade máxima de quebra-cabeças em validação ao mesmo tempo em validate_many_games_at_once,
+# cujos resultados handle_results guarda até poder printá-los em ordem
+REORDER_WINDOW = 1024
+
+
+def get_settings() -> dict:
+    """ Returns the settings of this file that main.py may change, to be
+    passed to the processes that do not inherit them (see configure)
+    """
+    return {"ring_batch_size": RING_BATCH_SIZE, "many_games_batch_size": MANY_GAMES_BATCH_SIZE, "cache": cache}
+
+
+def configure(settings: dict) -> None:
+    """ Applies the settings returned by get_settings in another process """
+    global RING_BATCH_SIZE, MANY_GAMES_BATCH_SIZE, cache
+    RING_BATCH_SIZE = settings["ring_batch_size"]
+    MANY_GAMES_BATCH_SIZE = settings["many_games_batch_size"]
+    cache = settings["cache"]
+
+
+def current_process_number() -> str:
+    """ Returns the number of the process shown in the output: the number set
+    in `worker` by the thread backends or, otherwise, the number in the
+    name of the current process
+    """
+    return getattr(worker, "process_number", None) or multiprocessing.current_process().name[8:]
+
+
+def cached(validation_func: Callable) -> Callable:
+    """ Puts the result cache in front of a validation strategy. With the
+    cache enabled, the strategy validates only the puzzles that are not in
+    the cache, with its output kept by a ResultRecorder, and then every
+    puzzle is printed, in order, with the result found or computed
+
+    Parameters
+    ----------
+    validation_func : function
+        The validation strategy
+
+    Return
+    ------
+    function
+        The strategy, with the same name and arguments
+    """
+    @wraps(validation_func)
+    def validate(solutions, solution_number: int, n_threads: int) -> None:
+        if cache is None:
+            return validation_func(solutions, solution_number, n_threads)
+
+        keys = result_cache.grid_keys(solutions)
+        results = cache.lookup(list(dict.fromkeys(keys)))
+
+        # cada quebra-cabeças que não está no cache é validado uma vez só, mesmo se repetido
+        missing: dict[bytes, int] = {}
+        for i, key in enumerate(keys):
+            if key not in results and key not in missing:
+                missing[key] = i
+
+        if missing:
+            indexes = list(missing.values())
+            if hasattr(solutions, "shape"):
+                subset = solutions[indexes]
+            elif isinstance(solutions, GridList):
+                subset = GridList.from_grids([solutions[i] for i in indexes])
+            else:
+                subset = [solutions[i] for i in indexes]
+            with results_output.recording() as recorder:
+                validation_func(subset, 1, n_threads)
+
+            # guarda a linha sem o "Processo N: ", que é acrescentado na impressão
+            new_results = {}
+            for number, key in enumerate(missing, 1):
+                n_errors, line = recorder.results[number]
+                new_results[key] = (n_errors, line.split(": ", 1)[1])
+            cache.store(new_results)
+            results.update(new_results)
+        cache.count(len(keys) - len(missing), len(missing))
+
+        process_number = current_process_number()
+        for i, key in enumerate(keys):
+            n_errors, line = results[key]
+            results_output.writer.progress(process_number, solution_number + i)
+            results_output.writer.result(solution_number + i, n_errors, f"Processo {process_number}: {line}")
+
+    return validate
+
 
 def create_threads(n: int) -> list[SudokuThread]:
     """ Creates the threads
@@ -46,59 +158,107 @@ def create_threads(n: int) -> list[SudokuThread]:
     return threads
 
 
-def print_results(results: dict[int, list[str]], process_number: int, n_threads: int = None) -> None:
-    """ Print the results of the validation of a puzzle
+def format_results(results: list[ValidationResult], process_number: int, size: int = 9) -> tuple[int, str]:
+    """ Format the results of the validation of a puzzle
 
     Parameters
     ----------
-    results : dict
-        The dictionary containing one result string for each validated puzzle
+    results : list[ValidationResult]
+        The errors found by each thread that found errors, in the order
+        in which the threads reported them
     process_number : int
         The number of the process that is being executed
-    n_threads : int
-        The number of threads that the program is using
+    size : int
+        The number of cells of each line, column and region (see boards.py)
 
     Return
     ------
-    None
+    tuple[int, str]
+        The number of errors and the line that reports them
     
     """
-    if len(results.keys()) == 0:
-        print(f"Processo {process_number}: 0 erros encontrados")
-        return
+    if len(results) == 0:
+        return 0, f"Processo {process_number}: 0 erros encontrados"
     
     errors = []
     n_erros = 0
 
-    for thread_num in results.keys():
-        n_erros += len(results[thread_num])
-        error = f"T{thread_num+1}: "
-        lines = []
-        columns = []
-        regions = []
-        results[thread_num] = sorted(results[thread_num])
-        for res in results[thread_num]:
-            if "L" in res:
-                lines.append(res)
-            elif "C" in res:
-                columns.append(res)
-            else:
-                regions.append(res)
-        
-        error += ', '.join(lines + columns + regions)
-        errors.append(error)
+    for result in results:
+        labels = error_labels(result.error_mask, size) # em ordem: linhas, colunas e regiões
+        n_erros += len(labels)
+        errors.append(f"T{result.thread_num+1}: " + ', '.join(labels))
     
     errors = '; '.join(errors)
-    print(f"Processo {process_number}: {n_erros} erros encontrados ({errors})")
+    return n_erros, f"Processo {process_number}: {n_erros} erros encontrados ({errors})"
+
+
+def add_error(results: list[ValidationResult], thread_num: int, code: int) -> None:
+    """ Adds the error `code` found by the thread `thread_num` to the results of a puzzle """
+    for result in results:
+        if result.thread_num == thread_num:
+            result.error_mask |= 1 << code
+            return
+
+    results.append(ValidationResult(1 << code, thread_num))
+
+
+def run_check(check: Callable, index: int, solution: list[list[int]]) -> tuple[int | None, int]:
+    """ Runs a check in a thread of a pool, returning its error code
+    together with the number of the thread
+    """
+    return check(index, solution), current_thread_number()
 
 
-def validate_game_creating_threads_once(solutions: list[list[list[int]]], solution_number, n_threads) -> None:
+def print_results(results: list[ValidationResult], process_number: int, n_threads: int = None, solution_number: int = None) -> None:
+    """ Print the results of the validation of a puzzle
+
+    Parameters
+    ----------
+    results : list[ValidationResult]
+        The errors found by each thread that found errors
+    process_number : int
+        The number of the process that is being executed
+    n_threads : int
+        The number of threads that the program is using
+    solution_number : int
+        The number of the puzzle, used to order the output (see results_output.py)
+
+    Return
+    ------
+    None
+    
+    """
+    n_erros, line = format_results(results, process_number)
+    results_output.writer.result(solution_number, n_erros, line)
+
+
+def print_progress(process_number: int, solution_number: int) -> None:
+    """ Print that a puzzle started to be validated
+
+    Parameters
+    ----------
+    process_number : int
+        The number of the process that is being executed
+    solution_number : int
+        The number of the puzzle
+
+    Return
+    ------
+    None
+    
+    """
+    instrumentation.count_progress()
+    results_output.writer.progress(process_number, solution_number)
+
+
+@cached
+def validate_game_creating_threads_once(solutions: GridList, solution_number, n_threads) -> None:
     """ Validates the game creating threads once and dividing
     the validations for the number of threads in each process
 
     Parameters
     ----------
-    solution : list[list[list[int]]]
+    solution : GridList
         The solution that one process is going to validate
     solution_number : int
         The number of the puzzle that is being validated
@@ -110,12 +270,12 @@ def validate_game_creating_threads_once(solutions: list[list[list[int]]], soluti
     None
     
     """
-    process_number = multiprocessing.current_process().name[8:]
-    functions_list = [validate_line, validate_column, validate_region]
+    process_number = current_process_number()
+    functions_list = instrumentation.wrap_checks([validate_line, validate_column, validate_region])
     threads = create_threads(n_threads)
     for i in range(len(solutions)):
-        print(f"Processo {process_number}: resolvendo quebra-cabeças {solution_number+i}")
-        results = {}
+        print_progress(process_number, solution_number+i)
+        results = []
         n_funcition = 0
         
         while n_funcition != 27:
@@ -131,29 +291,25 @@ def validate_game_creating_threads_once(solutions: list[list[list[int]]], soluti
                 n_funcition +=1
         
             for thread in threads:
-                thread.finished_lock.acquire() # espera até que a thread termine de executar a função
+                with instrumentation.waiting("semaphore"):
+                    thread.finished_lock.acquire() # espera até que a thread termine de executar a função
                 
-                if thread.result is None:
-                    continue
+                if thread.result is not None:
+                    add_error(results, thread.number, thread.result)
 
-                result, thread_num = thread.result
-                if thread_num in results.keys():
-                    results[thread_num].add(result)
-                else:
-                    results[thread_num] = set([result])
-
-        print_results(results, process_number, n_threads)
+        print_results(results, process_number, n_threads, solution_number+i)
         
     for thread in threads:
         thread.stop()
 
-def validate_game_creating_threads_once_and_using_thread_pool(solutions: list[list[list[int]]], solution_number: int, n_threads: int) -> None:
+@cached
+def validate_game_creating_threads_once_and_using_thread_pool(solutions: GridList, solution_number: int, n_threads: int) -> None:
     """ Validates the game using the creating threads once
     and thread pool executor method
 
     Parameters
     ----------
-    solution : list[list[list[int]]]
+    solution : GridList
         The solutions that one process is going to validate
     solution_number : int
         The number of the puzzle that is being validated
@@ -165,41 +321,37 @@ def validate_game_creating_threads_once_and_using_thread_pool(solutions: list[li
     None
 
     """
-    process_number = multiprocessing.current_process().name[8:]
+    process_number = current_process_number()
     with ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="Thread") as pool:
-        functions_list = [validate_line, validate_column, validate_region]
+        functions_list = instrumentation.wrap_checks([validate_line, validate_column, validate_region])
 
         for i,solution in enumerate(solutions):
-            print(f"Processo {process_number}: resolvendo quebra-cabeças {solution_number+i}")
-            results = {}
+            print_progress(process_number, solution_number+i)
+            results = []
             
             futures = []
             for j in range(27):
-                futures.append(pool.submit(functions_list[j % 3], j//3, solution))
+                futures.append(pool.submit(run_check, functions_list[j % 3], j//3, solution))
 
             
         
             for future in futures:
-                result = future.result()
+                with instrumentation.waiting("future"):
+                    code, thread_num = future.result()
                 
-                if result is None:
-                    continue
+                if code is not None:
+                    add_error(results, thread_num, code)
 
-                error, thread_num = result
-                if thread_num in results.keys():
-                    results[thread_num].add(error)
-                else:
-                    results[thread_num] = set([error])
+            print_results(results, process_number, n_threads, solution_number+i)
 
-            print_results(results, process_number, n_threads)
-
-def validate_game_thread_pool_executor(solutions: list[list[list[int]]], solution_number: int, n_threads: int) -> None:
+@cached
+def validate_game_thread_pool_executor(solutions: GridList, solution_number: int, n_threads: int) -> None:
     """ Validates the game using the thread pool executor
     method
 
     Parameters
     ----------
-    solution : list[list[list[int]]]
+    solution : GridList
         The solutions that one process is going to validate
     solution_number : int
         The number of the puzzle that is being validated
@@ -211,42 +363,38 @@ def validate_game_thread_pool_executor(solutions: list[list[list[int]]], solutio
     None
 
     """
-    process_number = multiprocessing.current_process().name[8:]
+    process_number = current_process_number()
 
     for i, solution in enumerate(solutions):
         with ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="Thread") as pool:
-            functions_list = [validate_line, validate_column, validate_region]
+            functions_list = instrumentation.wrap_checks([validate_line, validate_column, validate_region])
         
-            print(f"Processo {process_number}: resolvendo quebra-cabeças {solution_number+i}")
-            results = {}
+            print_progress(process_number, solution_number+i)
+            results = []
             
             futures = []
             for j in range(27):
-                futures.append(pool.submit(functions_list[j % 3], j//3, solution))
+                futures.append(pool.submit(run_check, functions_list[j % 3], j//3, solution))
 
             
         
             for future in futures:
-                result = future.result()
+                with instrumentation.waiting("future"):
+                    code, thread_num = future.result()
                 
-                if result is None:
-                    continue
+                if code is not None:
+                    add_error(results, thread_num, code)
 
-                error, thread_num = result
-                if thread_num in results.keys():
-                    results[thread_num].add(error)
-                else:
-                    results[thread_num] = set([error])
+            print_results(results, process_number, n_threads, solution_number+i)
 
-            print_results(results, process_number, n_threads)
 
-
-def validate_game_sequentially(solutions: list[list[list[int]]], solution_number: int, n_threads: int) -> None:
+@cached
+def validate_game_sequentially(solutions: GridList, solution_number: int, n_threads: int) -> None:
     """ Validates the game sequentially
 
     Parameters
     ----------
-    solution : list[list[list[int]]]
+    solution : GridList
         The solutions that one process is going to validate
     solution_number : int
         The number of the puzzle that is being validated
@@ -258,101 +406,220 @@ def validate_game_sequentially(solutions: list[list[list[int]]], solution_number
     None
 
     """
-    process_number = multiprocessing.current_process().name[8:]
+    process_number = current_process_number()
+    thread_num = current_thread_number()
+    validate = instrumentation.wrap_check(validate_grid, checks_per_call=27, grids_per_call=1)
 
     for i, solution in enumerate(solutions):
-        functions_list = [validate_line, validate_column, validate_region]
-    
-        print(f"Processo {process_number}: resolvendo quebra-cabeças {solution_number+i}")
+        print_progress(process_number, solution_number+i)
         
-        results = {}
-        for j in range(27):
-            func = functions_list[j % 3]
-            result = func(j//3, solution)
+        # as 27 validações são feitas em uma única passada pela matriz
+        results = results_from_mask(validate(solution), thread_num)
+        print_results(results, process_number, n_threads, solution_number+i)
 
-            if result is None:
-                continue
 
-            error, thread_num = result
-            if thread_num in results.keys():
-                results[thread_num].add(error)
-            else:
-                results[thread_num] = set([error])
 
-        print_results(results, process_number, n_threads)
+def results_from_mask(error_mask: int, thread_num: int) -> list[ValidationResult]:
+    """ Convert an error mask returned by validate_batch or validate_grid
+    into the list consumed by print_results
+
+    Parameters
+    ----------
+    error_mask : int
+        The 27-bit error mask of one puzzle
+    thread_num : int
+        The number of the thread that validated the puzzle
+
+    Return
+    ------
+    list[ValidationResult]
+        Empty if there are no errors, otherwise the errors found by the thread
+    """
+    if error_mask == 0:
+        return []
+
+    return [ValidationResult(int(error_mask), thread_num)]
+
 
+@cached
+def validate_game_vectorized(solutions: GridList, solution_number: int, n_threads: int) -> None:
+    """ Validates all the solutions of the process at once
+    using array operations (see validations.validate_batch)
 
+    Parameters
+    ----------
+    solution : GridList
+        The solutions that one process is going to validate
+    solution_number : int
+        The number of the puzzle that is being validated
+    n_threads : int
+        The number of threads that the program is using
+
+    Return
+    ------
+    None
 
-def handle_results(queue: Queue, n_solutions: int, process_number: int) -> None:
     """
-    - Recebe um Future enviado pela `queue` representando o resultado de uma validação de uma solução
-    - Uma solução validada é printada qunado o seu número de validações for igual a 27 e 
-      todos as soluções anteriores a ela já terem sido printadas
+    process_number = current_process_number()
+    begin = perf_counter()
+    error_masks = validate_batch(solutions_to_array(solutions))
+    instrumentation.count_batch(len(error_masks), 27, perf_counter() - begin)
+
+    # a validação é feita pela thread principal, assim como em validate_game_sequentially
+    thread_num = 1
+    for i, error_mask in enumerate(error_masks):
+        print_progress(process_number, solution_number+i)
+        print_results(results_from_mask(error_mask, thread_num), process_number, n_threads, solution_number+i)
+
+
+@cached
+def validate_game_task_ring(solutions: GridList, solution_number: int, n_threads: int) -> None:
+    """ Validates the game with persistent threads that take ranges of
+    RING_BATCH_SIZE puzzles from a shared deque, validating each puzzle
+    at once (see validations.validate_grid). The main thread only waits
+    for the threads once, at the end
+
+    Parameters
+    ----------
+    solution : GridList
+        The solutions that one process is going to validate
+    solution_number : int
+        The number of the puzzle that is being validated
+    n_threads : int
+        The number of threads that the program is using
+
+    Return
+    ------
+    None
+
     """
-    
-    # cada dicionário da lista representa uma solução validada pelo processo
-    # As chaves do dicionários são os identificadores das threads que realizaram a validação.
-    # O svalores são os erros encontrados pelas threads
-    validated_solutions: list[dict[int, list[str] | None]] = [dict() for _ in range(n_solutions)]
+    process_number = current_process_number()
+    tasks = deque((begin, min(begin + RING_BATCH_SIZE, len(solutions))) for begin in range(0, len(solutions), RING_BATCH_SIZE))
+
+    # os nomes seguem o padrão do ThreadPoolExecutor, usado para identificar a thread nos resultados
+    validate = instrumentation.wrap_check(validate_grid, checks_per_call=27, grids_per_call=1)
+    workers = [GridWorker(tasks, solutions, validate, name=f"Thread_{i}") for i in range(n_threads)]
+    for worker in workers:
+        worker.start()
+
+    results: list[list[ValidationResult]] = [[] for _ in range(len(solutions))]
+    for worker in workers:
+        with instrumentation.waiting("join"):
+            worker.join()
+        thread_num = int(worker.name[7:])
+        for i, error_mask in worker.results:
+            results[i] = results_from_mask(error_mask, thread_num)
 
-    # Lista com contadores indicando a quantidade de validações concluídas de cada resultado.
-    # Uma solução validada só é printada qunado o seu número de validações for igual a 27 e todos as soluções anteriores a ela já terem sido printadas
-    validation_counters: list[int] = [0 for _ in range(n_solutions)]
+    for i in range(len(solutions)):
+        print_progress(process_number, solution_number+i)
+        print_results(results[i], process_number, n_threads, solution_number+i)
+
+
+def handle_results(queue: Queue, n_solutions: int, process_number: int, first_solution: int = 1,
+                   free_slots: Semaphore = None, window: int = REORDER_WINDOW) -> None:
+    """
+    - Recebe um Future enviado pela `queue` representando o resultado da validação de um intervalo de soluções
+    - Uma solução validada é printada quando todas as soluções anteriores a ela já tiverem sido printadas
+    - Guarda apenas `window` soluções ao mesmo tempo: a solução i ocupa a posição i % window,
+      que é liberada (em `free_slots`) quando ela é printada
+    """
+    window = max(1, min(window, n_solutions))
+
+    # cada posição guarda os erros de uma solução validada pelo processo e ainda não printada
+    # (ver grid.ValidationResult), ou None se a solução ainda não foi validada
+    validated_solutions: list[list[ValidationResult] | None] = [None for _ in range(window)]
 
     # Indica o número da solução que será printada a seguir
     solution_to_print = 0
 
 
     """
-        - Enquanto ainda haver soluções a serem printadas, recebe uma validação de alguma solução e atualiza os dados referentes a ela.
-        - Caso todas as validações da solução atual tenham sido realizadas, printa os erros encontrados
+        - Enquanto ainda haver soluções a serem printadas, recebe a validação de um intervalo de soluções.
+        - Depois de cada intervalo, printa todas as soluções seguidas que já foram validadas
     """
-    while solution_to_print < n_solutions:
-        # - A queue inicialmente retorna um future. Quando o resultado de tal future for obtido, ele retornaŕa uma tupla contendo tais elementos:
-        #   - número da solução validada
-        #   - outra tupla contendo: O erro encontrado durante a validação e athread que encontrou tal erro. 
-        #     Caso nenhum erro seja encontrado, esse elemento será None
+    try:
+        while solution_to_print < n_solutions:
+            # - A queue inicialmente retorna um future. Quando o resultado de tal future for obtido, ele retornará
+            #   o número da thread que validou o intervalo, o índice da primeira solução do intervalo
+            #   e as máscaras de erros das soluções (ver validate_range)
 
 
-        future: Future = queue.get()
-        
-        # Cada resultado retorna uma lista contendo uma tupla que representa uma validação específica.
-        # Cada valiadção é composta pelo número da solução a qual ela está relacionada e outra tupla contento
-        # o erro encontrado e a thread que o encontrou. Caso nenhum erro tenha sido encontrado, a última tupla será None
-        results: list[tuple[int, tuple[str, int] | None]] = future.result()
-        for solution_number, error_info in results:
-            validation_counters[solution_number] += 1
-
-            # se algum erro foi encontrado
-            if error_info is not None:
-                error_msg, thread_number = error_info
-
-                if  thread_number in validated_solutions[solution_number].keys():
-                    validated_solutions[solution_number][thread_number].append(error_msg)
-                else:
-                    validated_solutions[solution_number][thread_number] = [error_msg]
+            instrumentation.record_queue_depth(queue.qsize())
+            with instrumentation.waiting("queue"):
+                future: Future = queue.get()
             
-
-            # se a validação da solução atual já pode ser printada
-            if validation_counters[solution_to_print] == 27:
-                print_results(validated_solutions[solution_number], process_number)
+            with instrumentation.waiting("future"):
+                thread_number, begin, error_masks = future.result()
+            for i, error_mask in enumerate(error_masks, begin):
+                validated_solutions[i % window] = results_from_mask(error_mask, thread_number)
+
+            # printa todas as soluções que já podem ser printadas, liberando suas posições
+            while solution_to_print < n_solutions and validated_solutions[solution_to_print % window] is not None:
+                slot = solution_to_print % window
+                print_results(validated_solutions[slot], process_number, solution_number=first_solution + solution_to_print)
+                validated_solutions[slot] = None
                 solution_to_print +=1
+                if free_slots is not None:
+                    free_slots.release()
+    finally:
+        # se o handler parar antes do fim (por exemplo, com a saída fechada), libera todas
+        # as posições, para que a submissão não fique esperando por elas para sempre
+        if free_slots is not None and solution_to_print < n_solutions:
+            free_slots.release(n_solutions - solution_to_print)
 
 
-def execute_validations(validations_to_execute: list[Callable[[], tuple[int, tuple[str, int]]]]) -> None:
-    results = []
-    for validation in validations_to_execute:
-        results.append(validation())
-    return results
+def validate_range(solutions: GridList, begin: int, end: int, validate: Callable, timing: list[float]) -> tuple[int, int, array]:
+    """ Validates the puzzles begin..end-1 in a thread of the pool
 
+    Parameters
+    ----------
+    solutions : GridList
+        The solutions of the process
+    begin : int
+        The index of the first puzzle of the range
+    end : int
+        The index after the last puzzle of the range
+    validate : Callable
+        validations.validate_grid, possibly instrumented
+    timing : list[float]
+        Receives the time per puzzle of the range, in seconds, in its first
+        position (see task_size)
+
+    Return
+    ------
+    tuple[int, int, array]
+        The number of the thread, `begin` and the 27-bit error masks of the
+        puzzles, packed in a single array
+    """
+    start = perf_counter()
+    error_masks = array("L", [validate(solution) for solution in solutions[begin:end]])
+    timing[0] = (perf_counter() - start) / (end - begin)
+    return current_thread_number(), begin, error_masks
+
+
+def task_size(timing: list[float], n_remaining: int, n_threads: int) -> int:
+    """ Returns the number of puzzles of the next task of validate_many_games_at_once:
+    MANY_GAMES_BATCH_SIZE, if it was set, or otherwise the number of puzzles
+    that takes about TARGET_TASK_TIME, by the time per puzzle measured in the
+    last task, without leaving threads of the pool without tasks
+    """
+    if MANY_GAMES_BATCH_SIZE is not None:
+        return MANY_GAMES_BATCH_SIZE
+
+    size = FIRST_TASK_SIZE if timing[0] is None else int(TARGET_TASK_TIME / max(timing[0], 1e-7))
+    return max(1, min(size, REORDER_WINDOW, -(-n_remaining // n_threads)))
 
-def validate_many_games_at_once(solutions: list[list[list[int]]], solution_number: int, n_threads: int) -> None:
-    """ Validates the game using the creating threads once
-    and thread pool executor method
+
+@cached
+def validate_many_games_at_once(solutions: GridList, solution_number: int, n_threads: int) -> None:
+    """ Validates the game with a thread pool executor whose tasks are
+    ranges of whole puzzles, each one validated at once (see
+    validations.validate_grid), returning their error masks packed in
+    an array
 
     Parameters
     ----------
-    solution : list[list[list[int]]]
+    solution : GridList
         The solutions that one process is going to validate
     solution_number : int
         The number of the puzzle that is being validated
@@ -365,32 +632,87 @@ def validate_many_games_at_once(solutions: list[list[list[int]]], solution_numbe
 
     """
     with ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="Thread") as pool:
-        process_number = multiprocessing.current_process().name[8:]
-        functions_list = [validate_line, validate_column, validate_region]
+        process_number = current_process_number()
+        validate = instrumentation.wrap_check(validate_grid, checks_per_call=27, grids_per_call=1)
         queue = Queue()
+        timing = [None] # tempo por quebra-cabeças medido na última tarefa
 
-        result_handler = Thread(target=handle_results, args=(queue, len(solutions), process_number))
+        # uma posição da janela de handle_results para cada solução em validação
+        free_slots = Semaphore(REORDER_WINDOW)
+        result_handler = Thread(target=handle_results, args=(queue, len(solutions), process_number, solution_number, free_slots, REORDER_WINDOW))
         result_handler.start()
 
-        validation_batch = [] # lista contendo validações que serão realizadas por uma única thread
-        for i,solution in enumerate(solutions):
-            print(f"Processo {process_number}: resolvendo quebra-cabeças {solution_number+i}")
-            for j in range(27):
-                def validation(
-                        solution_number = i,
-                        func = functions_list[j % 3],
-                        index = j//3,
-                        solution = solution
-                ):
-                    return solution_number, func(index, solution)
+        begin = 0 # primeira solução da tarefa que está sendo montada
+        size = task_size(timing, len(solutions), n_threads)
+        for i in range(len(solutions)):
+            if not free_slots.acquire(blocking=False):
+                # a janela está cheia: envia a tarefa incompleta, que pode conter
+                # a solução mais antiga da janela, e espera até ela ser printada
+                if begin < i:
+                    queue.put(pool.submit(validate_range, solutions, begin, i, validate, timing))
+                    begin = i
+                with instrumentation.waiting("window"):
+                    free_slots.acquire()
+
+            print_progress(process_number, solution_number+i)
+
+            if i + 1 - begin == size or i == len(solutions) - 1:
+                queue.put(pool.submit(validate_range, solutions, begin, i + 1, validate, timing))
+                begin = i + 1
+                size = task_size(timing, len(solutions) - begin, n_threads)
 
+        result_handler.join()
 
-                validation_batch.append(validation)
 
-                if len(validation_batch) == 10 or (i == len(solutions) - 1 and j == 26):
-                    future = pool.submit(execute_validations, validation_batch)
-                    validation_batch = []
+# estratégias que podem ser escolhidas pelo nome na linha de comando
+STRATEGIES = {
+    "validate_game_creating_threads_once": validate_game_creating_threads_once,
+    "validate_game_creating_threads_once_and_using_thread_pool": validate_game_creating_threads_once_and_using_thread_pool,
+    "validate_game_thread_pool_executor": validate_game_thread_pool_executor,
+    "validate_game_sequentially": validate_game_sequentially,
+    "validate_game_vectorized": validate_game_vectorized,
+    "validate_game_task_ring": validate_game_task_ring,
+    "validate_many_games_at_once": validate_many_games_at_once,
+}
+DEFAULT_STRATEGY = validate_many_games_at_once
 
-                    queue.put(future)
+# estratégias que dividem o trabalho em lotes de tamanho ajustável (--batch-size)
+BATCH_STRATEGIES = [validate_game_task_ring, validate_many_games_at_once]
 
-        result_handler.join()
+
+def get_batch_size(validation_func) -> int | None:
+    """ Returns the batch size used by a strategy, or None if it does not use
+    batches or chooses their size by itself
+    """
+    if validation_func is validate_game_task_ring:
+        return RING_BATCH_SIZE
+    if validation_func is validate_many_games_at_once:
+        return MANY_GAMES_BATCH_SIZE
+    return None
+
+
+def set_batch_size(validation_func, batch_size: int | None) -> None:
+    """ Changes the batch size of a strategy in BATCH_STRATEGIES in this process.
+    The processes created afterwards inherit it.
+
+    Parameters
+    ----------
+    validation_func : function
+        One of BATCH_STRATEGIES
+    batch_size : int | None
+        The number of puzzles in each task. None makes validate_many_games_at_once
+        choose it by the measured time of the tasks
+
+    Return
+    ------
+    None
+    """
+    global RING_BATCH_SIZE, MANY_GAMES_BATCH_SIZE
+    if validation_func is validate_game_task_ring:
+        RING_BATCH_SIZE = batch_size
+    elif validation_func is validate_many_games_at_once:
+        MANY_GAMES_BATCH_SIZE = batch_size
+
+
+# estratégias que recebem as soluções diretamente como um numpy.ndarray (N, 9, 9)
+ARRAY_STRATEGIES = [validate_game_vectorized]
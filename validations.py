@@ -1,18 +1,92 @@
-from threading import Thread, Semaphore, current_thread
+from threading import Thread, Semaphore, current_thread, local
 from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures import as_completed
 from SudokuThread import SudokuThread
-import numpy
+from itertools import chain
+from grid import GridList
 ## This is a file with the validations functions
 
+# The errors of a grid are packed in a 27-bit mask: bits 0-8 are the lines,
+# bits 9-17 the columns and bits 18-26 the regions, so iterating the bits in
+# ascending order yields the errors already in the order print_results uses.
+# The same layout is used by validate_grid and validate_batch.
+
+FULL_MASK = 0x3FE # bits 1 to 9 set, one for each digit
+NUM_VALIDATIONS = 27
+ERROR_KINDS = "LCR"
+LINE, COLUMN, REGION = range(3) # tipos de erro, na ordem de ERROR_KINDS
+
+# número da thread atual, resolvido uma vez por thread (ver current_thread_number)
+identity = local()
+
+
+def error_code(kind: int, index: int) -> int:
+    """ Return the code of the error of a unit: its bit in the error mask
+
+    Parameters
+    ----------
+    kind : int
+        LINE, COLUMN or REGION
+    index : int
+        The index of the unit, from 0 to 8
+
+    Return
+    ------
+    int
+        A number from 0 to 26
+    """
+    return kind * 9 + index
+
+
+def digit_bit(value: int) -> int:
+    """ Return the bit that represents a digit in a unit mask
+
+    Parameters
+    ----------
+    value : int
+        The value of a cell
+
+    Return
+    ------
+    int
+        1 << value for the digits 1 to 9. Zeros and values out of range
+        are mapped to bit 0, which is not part of FULL_MASK
+    """
+    if 1 <= value <= 9:
+        return 1 << value
+    return 1
+
+
+def unit_mask(list: list[int]) -> int:
+    """ OR the bits of the values of a line, column or region
+
+    Parameters
+    ----------
+    list : list
+        The list with the column, line or region numbers
+
+    Return
+    ------
+    int
+        The mask with the bit 1 << value set for each value found. Zeros
+        and values above 9 set bits outside FULL_MASK, so, unlike
+        digit_bit, no test is needed for them
+    """
+    mask = 0
+    for value in list:
+        # sem chamar digit_bit nem int() para cada célula: este é o caminho das estratégias com threads
+        mask |= 1 << value
+
+    return mask
+
+
 def count_to_nine(list: list[int]) -> bool:
-    """ Count from 1 to 9 verifing if the list contains 
-    one of each number
+    """ Verify if the list contains one of each number from 1 to 9
 
     Parameters
     ----------
-    sound : list
-        The list with the comlum, line or region numbers
+    list : list
+        The list with the column, line or region numbers
 
     Return
     ------
@@ -20,16 +94,117 @@ def count_to_nine(list: list[int]) -> bool:
         If it has an error, return false, if it's ok 
         return true
     """
-    for i in range(1,10):
-        if i not in list:
+    return unit_mask(list) == FULL_MASK
+
+
+def grid_masks(matrix: list[list[int]]) -> tuple[list[int], list[int], list[int]]:
+    """ Build the masks of all lines, columns and regions of a
+    matrix in a single traversal
+
+    Parameters
+    ----------
+    matrix : list
+        The matrix
+
+    Return
+    ------
+    tuple[list[int], list[int], list[int]]
+        The masks of the 9 lines, 9 columns and 9 regions
+    """
+    lines = [0] * 9
+    columns = [0] * 9
+    regions = [0] * 9
+
+    for i in range(9):
+        row = matrix[i]
+        region_line = (i // 3) * 3
+        line_mask = 0
+        for j in range(9):
+            bit = digit_bit(int(row[j]))
+            line_mask |= bit
+            columns[j] |= bit
+            regions[region_line + j // 3] |= bit
+        lines[i] = line_mask
+
+    return lines, columns, regions
+
+
+def validate_grid(matrix: list[list[int]]) -> int:
+    """ Validate the 27 constraints of a matrix in a single traversal
+
+    Parameters
+    ----------
+    matrix : list
+        The matrix
+
+    Return
+    ------
+    int
+        The 27-bit error mask of the matrix (0 means that it is valid),
+        with the same layout used by validate_batch
+    """
+    error_mask = 0
+    for bit, mask in enumerate(chain(*grid_masks(matrix))):
+        if mask != FULL_MASK:
+            error_mask |= 1 << bit
+
+    return error_mask
+
+
+DIGITS = frozenset(range(1, 10))
+
+
+def is_valid(matrix: list[list[int]]) -> bool:
+    """ Verify if a matrix is a valid solution, stopping at the first
+    line, column or region with an error
+
+    Parameters
+    ----------
+    matrix : list
+        The matrix
+
+    Return
+    ------
+    bool
+        True if the 27 constraints hold
+    """
+    # 9 células com os 9 dígitos formam uma permutação, então comparar os conjuntos basta
+    for row in matrix:
+        if set(row) != DIGITS:
             return False
 
+    for column in zip(*matrix):
+        if set(column) != DIGITS:
+            return False
+
+    for i in range(0, 9, 3):
+        for j in range(0, 9, 3):
+            if set(matrix[i][j:j + 3] + matrix[i + 1][j:j + 3] + matrix[i + 2][j:j + 3]) != DIGITS:
+                return False
+
     return True
 
-def validate_line(line_number: int, matrix: list[int]) -> tuple[str, int]:
-    from threading import current_thread
-    """ Define the initial point, final point and the steps to
-    create a list of a line and call the count function
+
+def current_thread_number() -> int:
+    """ Return the number of the thread used to tag the errors. It is
+    read from the name of the thread only in the first call of each thread
+
+    Return
+    ------
+    int
+        the number in the name of the threads created by the strategies,
+        otherwise 1 (the main thread of a process or of a worker, see backends.py)
+    """
+    number = getattr(identity, "number", None)
+    if number is None:
+        thread_name = current_thread().name
+        number = identity.number = int(thread_name[7:]) if thread_name.startswith("Thread") else 1
+
+    return number
+
+
+def validate_line(line_number: int, matrix: list[int]) -> int | None:
+    """ Verify one line of the matrix
 
     Parameters
     ----------
@@ -40,21 +215,14 @@ def validate_line(line_number: int, matrix: list[int]) -> tuple[str, int]:
 
     Return
     ------
-    str
-        The information of an error, if there was an error
-    int
-        The number of the thread 
+    int | None
+        The code of the error (see error_code), if there was an error
     """
-    input_list = matrix[line_number]
+    if not count_to_nine(matrix[line_number]):
+        return error_code(LINE, line_number)
 
-    thread_name = current_thread().name
-    thread_num = 1 if thread_name == "MainThread" else int(thread_name[7:])
-    if not count_to_nine(input_list):
-        return f"L{line_number+1}", thread_num
-
-def validate_column(column_number: int, matrix: list[int]) -> tuple[str, int]:
-    """ Define the initial point, final point and the steps to
-    create a list of a column and call the count function
+def validate_column(column_number: int, matrix: list[int]) -> int | None:
+    """ Create a list of a column and call the count function
 
     Parameters
     ----------
@@ -65,24 +233,17 @@ def validate_column(column_number: int, matrix: list[int]) -> tuple[str, int]:
 
     Return
     ------
-    str
-        The information of an error, if there was an error
-    int
-        The number of the thread 
+    int | None
+        The code of the error (see error_code), if there was an error
     """
-    input_list = []
+    input_list = [line[column_number] for line in matrix]
 
-    matrix_transpose = numpy.transpose(numpy.array(matrix))
-    input_list = matrix_transpose[column_number]
-    
-    thread_name = current_thread().name
-    thread_num = 1 if thread_name == "MainThread" else int(thread_name[7:])
     if not count_to_nine(input_list):
-        return f"C{column_number+1}", thread_num
+        return error_code(COLUMN, column_number)
 
-def validate_region(region_number: int, matrix: list[int]) -> tuple[str, int]:
-    """ Define the initial point, final point and the steps to
-    create a list of a region and call the count function
+def validate_region(region_number: int, matrix: list[int]) -> int | None:
+    """ Define the initial point of a region, create a list
+    of the region and call the count function
 
     Parameters
     ----------
@@ -93,28 +254,138 @@ def validate_region(region_number: int, matrix: list[int]) -> tuple[str, int]:
 
     Return
     ------
-    str
-        The information of an error, if there was an error
-    int
-        The number of the thread 
+    int | None
+        The code of the error (see error_code), if there was an error
     """
-    input_list = []
-
     initial_point_line = ((region_number) // 3) * 3
     initial_point_column = ((region_number) % 3) * 3
-    
+
+    input_list = []
     for i in range(initial_point_line, initial_point_line + 3):
-        for j in range(initial_point_column, initial_point_column + 3):
-            input_list.append(matrix[i][j])
+        input_list.extend(matrix[i][initial_point_column:initial_point_column + 3])
 
-    thread_name = current_thread().name
-    thread_num = 1 if thread_name == "MainThread" else int(thread_name[7:])
     if not count_to_nine(input_list):
-        return f"R{region_number+1}", thread_num
-    
-    
+        return error_code(REGION, region_number)
 
 
+## Vectorized validation of many grids at once
+#
+# numpy is imported inside these functions, so that importing this file (and
+# validate_game) does not load it: numpy cannot be loaded in the subinterpreters
+# of backends.py.
+
+def solutions_to_array(solutions: GridList | list[list[list[int]]]) -> "numpy.ndarray":
+    """ Convert a list of solutions into a single (N, 9, 9) array
+
+    Parameters
+    ----------
+    solutions : GridList | list[list[list[int]]]
+        The solutions, as a GridList or as a list of matrices
+
+    Return
+    ------
+    numpy.ndarray
+        uint8 array with shape (N, 9, 9)
+    """
+    if isinstance(solutions, GridList):
+        return solutions.to_array()
 
+    import numpy
+    if len(solutions) == 0:
+        return numpy.zeros((0, 9, 9), dtype=numpy.uint8)
 
+    return numpy.asarray(solutions, dtype=numpy.uint8).reshape(-1, 9, 9)
+
+
+def validate_batch(grids: "numpy.ndarray") -> "numpy.ndarray":
+    """ Validate the 27 constraints of every grid in a few array operations
+
+    Parameters
+    ----------
+    grids : numpy.ndarray
+        Array with shape (N, 9, 9) containing the solutions
+
+    Return
+    ------
+    numpy.ndarray
+        uint32 array with shape (N,), one 27-bit error mask per grid
+        (0 means that the grid is valid)
+    """
+    import numpy
+    grids = numpy.asarray(grids)
+    n_grids = grids.shape[0]
+
+    # zeros and values out of 1..9 are mapped to bit 0, which is not part of
+    # FULL_MASK, so any unit containing them is reported as an error
+    digits = numpy.where((grids >= 1) & (grids <= 9), grids, 0).astype(numpy.uint16)
+    bits = numpy.left_shift(numpy.uint16(1), digits)
+
+    lines = numpy.bitwise_or.reduce(bits, axis=2)
+    columns = numpy.bitwise_or.reduce(bits, axis=1)
+    regions = numpy.bitwise_or.reduce(
+        bits.reshape(n_grids, 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(n_grids, 9, 9),
+        axis=2
+    )
+
+    errors = numpy.concatenate((lines, columns, regions), axis=1) != FULL_MASK
+    weights = numpy.left_shift(numpy.uint32(1), numpy.arange(NUM_VALIDATIONS, dtype=numpy.uint32))
+    return errors.astype(numpy.uint32) @ weights
+
+
+def valid_batch(grids: "numpy.ndarray") -> "numpy.ndarray":
+    """ Verify which grids are valid solutions. The columns are checked
+    only in the grids whose lines are valid, and the regions only in the
+    grids whose lines and columns are valid
+
+    Parameters
+    ----------
+    grids : numpy.ndarray
+        Array with shape (N, 9, 9) containing the solutions
+
+    Return
+    ------
+    numpy.ndarray
+        bool array with shape (N,), True for the valid grids
+    """
+    import numpy
+    grids = numpy.asarray(grids)
+    digits = numpy.where((grids >= 1) & (grids <= 9), grids, 0).astype(numpy.uint16)
+    bits = numpy.left_shift(numpy.uint16(1), digits)
+
+    remaining = (numpy.bitwise_or.reduce(bits, axis=2) == FULL_MASK).all(axis=1).nonzero()[0]
+
+    bits = bits[remaining]
+    columns_ok = (numpy.bitwise_or.reduce(bits, axis=1) == FULL_MASK).all(axis=1)
+    remaining, bits = remaining[columns_ok], bits[columns_ok]
+
+    regions = bits.reshape(len(bits), 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(len(bits), 9, 9)
+    remaining = remaining[(numpy.bitwise_or.reduce(regions, axis=2) == FULL_MASK).all(axis=1)]
+
+    valid = numpy.zeros(len(grids), dtype=bool)
+    valid[remaining] = True
+    return valid
+
+
+def error_labels(error_mask: int, size: int = 9) -> list[str]:
+    """ Convert a 27-bit error mask into the error strings (L1, C3, R9...)
+
+    Parameters
+    ----------
+    error_mask : int
+        The mask returned by validate_batch for one grid
+    size : int
+        The number of cells of each unit; boards larger than 9x9 have
+        masks of 3 * size bits with the same layout (see boards.py)
+
+    Return
+    ------
+    list[str]
+        The errors, in the order lines, columns, regions
+    """
+    error_mask = int(error_mask)
+    labels = []
+    for bit in range(3 * size):
+        if error_mask >> bit & 1:
+            labels.append(f"{ERROR_KINDS[bit // size]}{bit % size + 1}")
 
+    return labels